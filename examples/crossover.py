@@ -2,32 +2,33 @@
 
     In this example, we partition two 640 by 480 BMP files by line, before
     calling the crossover algorithm with an alternating function, and with the
-    default random function.
+    default random function. The partition is read from the BMP header (see
+    `grom.Image`), which also crosses over whole areas at once.
 """
 
-from grom import Genome
-Genome.DEBUG = False
-
-# create a line-by-line partition system for a `.bmp` file of 640x480,
-# keeping the signature separated
-lineSize = 640 * 3
-P = [('head', range(0, 0x36))] + \
-    [('l' + str(k), range(0x36 + lineSize * k, 0x36 + lineSize * (k+1))) \
-     for k in range(480)]
+import grom
+grom.debug(False)
 
 # this function will return `d1` every even calls and `d2` every odd calls
 counter = 0
-def f(d1, d2):
+def f(d1, d2, k):
     global counter
     counter+= 1
     return (d1, d2)[counter % 2]
 
-# create `Genome` from the images and apply partition system
-a = Genome("examples/src/img1.bmp").partition(P)
-b = Genome("examples/src/img2.bmp").partition(P)
+# create `Genome` from the images and apply a line-by-line partition system,
+# keeping the header separated
+a = grom.Genome("examples/src/img1.bmp")
+b = grom.Genome("examples/src/img2.bmp")
+P = grom.Image.bmp(a).partition()
+a.setPartition(P)
+b.setPartition(P)
 
 # crossover the images then ask OS to open the resulting "test1.bmp"
 a.crossover(b, "test1.bmp", crosser=f)()
 
 # crossover with the default random function, along the lines of the image
 a.crossover(b, "test2.bmp")()
+
+# take the green channel of `b` into a copy of `a`, in a single operation
+grom.Image.bmp(a).crossover(b, "test3.bmp", channel=1).genome()
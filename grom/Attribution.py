@@ -0,0 +1,126 @@
+import grom
+import array
+
+class Attribution:
+    """ A map of how many times each block of a `Genome`'s data was edited.
+
+        The data is cut into blocks of `block` bytes (1 for a per-byte map),
+        each with a counter, in a compact `array`. Once attached (see
+        `Genome.attribute`), the map registers itself as one of the `Genome`'s
+        watchers and counts the blocks whose bytes an edit actually changed,
+        whatever the operator (`mutate`, `geneswap`, `apply`, `crossover`...).
+        It is copied along to the children, so they inherit the edits of
+        their lineage.
+
+        `Generation.heatmap` combines the maps of a population with its
+        fitness into a map of the same shape, whose `counts` are weights: see
+        the `heatmap` argument of `Genome.mutate`.
+    """
+    def __init__(self, block=0x100, counts=None):
+        """ Creates a map of blocks of `block` bytes, see `Genome.attribute`.
+        """
+        self.block = block
+        self.counts = counts if counts is not None else array.array('I')
+        self.genome = None
+
+    def __len__(self):
+        return len(self.counts)
+
+    def attach(self, genome):
+        """ Binds the map to `genome`, resizing it to the data if needed.
+        """
+        self.genome = genome
+        self.resize(0)
+        genome.watchers.append(self.touch)
+
+        return self
+
+    def copy(self):
+        """ Returns an unbound copy of this map.
+        """
+        return Attribution(self.block, array.array(self.counts.typecode,
+                                                   self.counts))
+
+    def resize(self, at):
+        """ Adds or removes counters from the block at `at` onward, so that
+            the map covers the data again.
+        """
+        n = -(-self.genome.size // self.block) - len(self.counts)
+        k = min(at // self.block, len(self.counts))
+        if 0 < n:
+            self.counts[k:k] = array.array(self.counts.typecode, [0]) * n
+        elif n < 0:
+            k = min(k, len(self.counts) + n)
+            del self.counts[k:k - n]
+
+    def touch(self, genome, st, old, new):
+        """ Watcher counting the blocks an edit changed.
+
+            If the size of the data changed, counters are added or removed
+            where it did (which is approximate when the change is not a
+            multiple of `block`), and every block the new bytes cover counts.
+        """
+        b = self.block
+        if len(old) != len(new):
+            self.resize(st)
+            old = None
+        elif old == new:
+            return
+
+        for k in range(st // b, (st + max(len(new), 1) - 1) // b + 1):
+            lo, hi = max(st, k * b) - st, min(st + len(new), k * b + b) - st
+            if old is None or old[lo:hi] != new[lo:hi]:
+                if k < len(self.counts):
+                    self.counts[k]+= 1
+
+    def weights(self, ranges):
+        """ Cuts `ranges` along the blocks, for weighted sampling.
+
+            Returns a list of `range`s and the list of their cumulated weights
+            (each piece weighs the counter of its block times its length).
+        """
+        b = self.block
+        pieces, cumulated, total = [], [], 0
+        for r in ranges:
+            for k in range(r.start // b, (r.stop - 1) // b + 1):
+                piece = range(max(r.start, k * b), min(r.stop, k * b + b))
+                w = self.counts[k] if k < len(self.counts) else 0
+                if piece and w:
+                    total+= w * len(piece)
+                    pieces.append(piece)
+                    cumulated.append(total)
+
+        return pieces, cumulated
+
+    @staticmethod
+    def heatmap(maps, fitness, prior=.1):
+        """ Combines `maps` with the `fitness` of their `Genome`s.
+
+            The heat of a block is the mean fitness (above the average) of the
+            `Genome`s that edited it, weighted by their counts: blocks whose
+            edits go along with better fitness get hotter. The result is a map
+            (of the same `block` size) of non-negative weights, with `prior`
+            times the hottest weight added everywhere so that no block is left
+            out entirely.
+        """
+        if not maps:
+            return Attribution()
+
+        block = maps[0].block
+        mean = sum(fitness) / len(fitness)
+        size = max(len(m) for m in maps)
+        heat, hits = [0.] * size, [0] * size
+
+        for m, f in zip(maps, fitness):
+            if m.block != block:
+                raise ValueError("maps of different block sizes")
+            d = f - mean
+            for k, c in enumerate(m.counts):
+                if c:
+                    heat[k]+= c * d
+                    hits[k]+= c
+
+        heat = [max(0., h / n) if n else 0. for h, n in zip(heat, hits)]
+        floor = prior * max(heat) if any(heat) else 1.
+
+        return Attribution(block, array.array('d', (h + floor for h in heat)))
@@ -0,0 +1,138 @@
+import grom
+
+class Checksum:
+    """ A checksum stored in the data, kept up to date through the edits.
+
+        Covers the sum of the bytes from `start` to `end` (excluded, `None`
+        for the end of the data), except those of the checksum field itself,
+        `size` bytes at `at`. The `compute` function turns that sum into the
+        `bytes` to store in the field.
+
+        Once attached to a `Genome` (see `Genome.addChecksum`), the sum is
+        updated from the bytes each edit replaces, so the field can be fixed
+        in constant time, however large the data. Ready-made handlers for
+        common ROM formats are built by the static methods of this class.
+    """
+    def __init__(self, name, start, end, at, size, compute):
+        """ Creates a checksum handler, see the class documentation.
+        """
+        self.name = name
+        self.start = start
+        self.end = end
+        self.at = at
+        self.size = size
+        self.compute = compute
+
+        self.genome = None
+        self.sum = 0
+
+    def __str__(self):
+        return "Checksum {} (at 0x{:X})".format(self.name, self.at)
+
+    @staticmethod
+    def gbHeader():
+        """ Game Boy header checksum, at 0x14D.
+        """
+        return Checksum("GB header", 0x134, 0x14D, 0x14D, 1,
+                        lambda s: bytes(((-s - 25) & 0xFF,)))
+
+    @staticmethod
+    def gbGlobal():
+        """ Game Boy global checksum (big-endian), at 0x14E.
+
+            It covers the header checksum: attach it after `gbHeader`.
+        """
+        return Checksum("GB global", 0, None, 0x14E, 2,
+                        lambda s: (s & 0xFFFF).to_bytes(2, 'big'))
+
+    @staticmethod
+    def gba():
+        """ Game Boy Advance header complement check, at 0xBD.
+        """
+        return Checksum("GBA header", 0xA0, 0xBD, 0xBD, 1,
+                        lambda s: bytes(((-s - 0x19) & 0xFF,)))
+
+    def attach(self, genome, recount=True):
+        """ Binds the handler to `genome`.
+
+            The covered bytes are summed once, unless `recount` is `False`
+            (the sum is then assumed to already match the data).
+        """
+        self.genome = genome
+        if recount:
+            self.sum = self.total()
+        genome.watchers.append(self.touch)
+
+        return self
+
+    def copy(self):
+        """ Returns an unbound copy of this handler, its sum included.
+        """
+        other = Checksum(self.name, self.start, self.end, self.at, self.size,
+                         self.compute)
+        other.sum = self.sum
+
+        return other
+
+    def total(self):
+        """ Sums the covered bytes from scratch.
+        """
+        data = self.genome.data
+        end = self.genome.size if self.end is None else self.end
+        field = data[self.at:self.at + self.size]
+        inside = sum(field) if self.start <= self.at < end else 0
+
+        return sum(data[self.start:end]) - inside
+
+    def partial(self, st, data):
+        """ Sum of the covered bytes of `data`, found at `st` in the `Genome`.
+        """
+        end = st + len(data) if self.end is None else self.end
+        lo, hi = max(st, self.start), min(st + len(data), end)
+        if hi <= lo:
+            return 0
+
+        s = sum(data[lo - st:hi - st])
+        for p in range(max(lo, self.at), min(hi, self.at + self.size)):
+            s-= data[p - st]
+
+        return s
+
+    def touch(self, genome, st, old, new):
+        """ Watcher updating the sum with the bytes an edit replaced.
+
+            If the size of the data changed, the covered bytes after `st`
+            moved: the sum is done again, unless nothing moved but the end of
+            an open-ended range.
+        """
+        if len(old) == len(new) or (self.end is None and
+                                    self.at + self.size <= st):
+            self.sum+= self.partial(st, new) - self.partial(st, old)
+        elif self.end is None or st < self.end:
+            self.sum = self.total()
+
+    def value(self):
+        """ Returns the `bytes` the field should hold.
+        """
+        return self.compute(self.sum)
+
+    def fix(self):
+        """ Writes the expected value into the field, if it differs.
+        """
+        value = self.value()
+        if self.genome.data[self.at:self.at + self.size] != value:
+            self.genome.edit(self.at, self.at + self.size, value)
+
+        return self
+
+    def verify(self):
+        """ Checks the handler against a full computation.
+
+            Returns a tuple of two `bool`: whether the incremental sum matches
+            a sum done from scratch, and whether the field holds the value it
+            should.
+        """
+        expected = self.compute(self.total())
+        stored = self.genome.data[self.at:self.at + self.size]
+
+        return self.sum == self.total(), stored == expected
@@ -0,0 +1,214 @@
+import grom
+import collections
+import hashlib
+import re
+import threading
+
+class Compression:
+    """ A compression format for blocks of data stored compressed in a ROM.
+
+        `decompress(data)` returns the expanded `bytes` of the block at the
+        start of `data`, `compress(data)` returns the block for the expanded
+        `data`. Ready-made formats are built by the static methods of this
+        class (the GBA BIOS ones, as used for graphics and tilemaps).
+
+        Decompressing in Python is slow, so expanded blocks are kept in a
+        cache shared by every `Genome`, of the `Compression.CACHE` most
+        recently used, keyed by the hash of the compressed bytes: the many
+        copies of a block across a `Generation` are only decompressed once.
+        See `Genome.addCompressed` to have operators work on the expanded
+        data.
+    """
+    CACHE = 64
+
+    cache = collections.OrderedDict()
+    lock = threading.Lock()
+
+    def __init__(self, name, compress, decompress):
+        """ Creates a compression format, see the class documentation.
+        """
+        self.name = name
+        self.compress = compress
+        self.decompress = decompress
+
+    def __str__(self):
+        return "Compression {}".format(self.name)
+
+    @staticmethod
+    def lz77():
+        """ GBA BIOS LZ77 (type 0x10, as `LZ77UnCompWram`).
+        """
+        return Compression("LZ77", Compression.lz77Compress,
+                           Compression.lz77Decompress)
+
+    @staticmethod
+    def rle():
+        """ GBA BIOS run-length encoding (type 0x30, as `RLUnCompWram`).
+        """
+        return Compression("RLE", Compression.rleCompress,
+                           Compression.rleDecompress)
+
+    def key(self, data):
+        """ Returns the key of the compressed block `data` in the cache.
+        """
+        return (self.name, hashlib.blake2b(data, digest_size=16).digest())
+
+    def expand(self, data):
+        """ Returns the expanded `bytes` of the block `data`, from the cache
+            if possible.
+        """
+        key = self.key(data)
+        with Compression.lock:
+            if key in Compression.cache:
+                Compression.cache.move_to_end(key)
+                return Compression.cache[key]
+
+        expanded = self.decompress(data)
+        Compression.remember(key, expanded)
+
+        return expanded
+
+    @staticmethod
+    def remember(key, expanded):
+        """ Stores an expanded block in the cache, dropping the least recently
+            used ones.
+        """
+        with Compression.lock:
+            Compression.cache[key] = expanded
+            Compression.cache.move_to_end(key)
+            while Compression.CACHE < len(Compression.cache):
+                Compression.cache.popitem(last=False)
+
+    @staticmethod
+    def header(data, kind):
+        """ Reads the 4 bytes header of a GBA BIOS block of type `kind`.
+
+            Returns the expanded size, raises a `ValueError` if the block is of
+            another type.
+        """
+        if len(data) < 4 or data[0] & 0xF0 != kind:
+            raise ValueError("not a block of type 0x{:02X}".format(kind))
+
+        return int.from_bytes(data[1:4], 'little')
+
+    @staticmethod
+    def lz77Decompress(data):
+        """ Expands a GBA BIOS LZ77 block.
+        """
+        size = Compression.header(data, 0x10)
+        out = bytearray()
+        k = 4
+
+        while len(out) < size:
+            flags = data[k]
+            k+= 1
+            for bit in range(7, -1, -1):
+                if size <= len(out):
+                    break
+                if flags >> bit & 1:
+                    n = (data[k] >> 4) + 3
+                    d = ((data[k] & 0xF) << 8 | data[k + 1]) + 1
+                    k+= 2
+                    if n <= d: # no overlap, one slice
+                        out+= out[len(out) - d:len(out) - d + n]
+                    else:
+                        for c in range(n):
+                            out.append(out[-d])
+                else:
+                    out.append(data[k])
+                    k+= 1
+
+        return bytes(out[:size])
+
+    @staticmethod
+    def lz77Compress(data):
+        """ Packs `data` into a GBA BIOS LZ77 block.
+
+            Greedy: at each position, the longest match (3 to 18 bytes within
+            the 4096 previous ones) is searched with `bytes.rfind`, at C speed,
+            each hit being extended before looking for a longer one.
+            The block is padded to a multiple of 4 bytes.
+        """
+        data = bytes(data)
+        out = bytearray((0x10,)) + len(data).to_bytes(3, 'little')
+        k = 0
+
+        while k < len(data):
+            at = len(out)
+            out.append(0)
+            for bit in range(7, -1, -1):
+                if len(data) <= k:
+                    break
+
+                lo, limit = max(0, k - 0x1000), min(18, len(data) - k)
+                best, where, n = 0, 0, 3
+                while n <= limit:
+                    p = data.rfind(data[k:k + n], lo, k + n - 1)
+                    if p < 0:
+                        break
+                    m = n
+                    while m < limit and data[p + m] == data[k + m]:
+                        m+= 1
+                    best, where, n = m, p, m + 1
+
+                if best:
+                    d = k - where - 1
+                    out[at]|= 1 << bit
+                    out+= bytes(((best - 3) << 4 | d >> 8, d & 0xFF))
+                    k+= best
+                else:
+                    out.append(data[k])
+                    k+= 1
+
+        return bytes(out + bytes(-len(out) % 4))
+
+    @staticmethod
+    def rleDecompress(data):
+        """ Expands a GBA BIOS RLE block.
+        """
+        size = Compression.header(data, 0x30)
+        out = bytearray()
+        k = 4
+
+        while len(out) < size:
+            flag = data[k]
+            if flag & 0x80:
+                out+= bytes((data[k + 1],)) * ((flag & 0x7F) + 3)
+                k+= 2
+            else:
+                n = (flag & 0x7F) + 1
+                out+= data[k + 1:k + 1 + n]
+                k+= 1 + n
+
+        return bytes(out[:size])
+
+    @staticmethod
+    def rleCompress(data):
+        """ Packs `data` into a GBA BIOS RLE block.
+
+            Runs of 3 to 130 identical bytes are found with a regular
+            expression, the bytes between them are stored as is (by 128).
+            The block is padded to a multiple of 4 bytes.
+        """
+        data = bytes(data)
+        out = bytearray((0x30,)) + len(data).to_bytes(3, 'little')
+
+        def raw(st, ed):
+            for k in range(st, ed, 0x80):
+                chunk = data[k:min(ed, k + 0x80)]
+                out.append(len(chunk) - 1)
+                out.extend(chunk)
+
+        k = 0
+        for m in re.finditer(rb'(?s)(.)\1{2,}', data):
+            raw(k, m.start())
+            for st in range(m.start(), m.end(), 130):
+                n = min(130, m.end() - st)
+                if n < 3:
+                    raw(st, st + n)
+                else:
+                    out+= bytes((0x80 | n - 3, data[st]))
+            k = m.end()
+        raw(k, len(data))
+
+        return bytes(out + bytes(-len(out) % 4))
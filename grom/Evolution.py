@@ -0,0 +1,511 @@
+import grom
+import multiprocessing
+import queue
+import time
+from concurrent import futures
+from multiprocessing import shared_memory
+
+def tournament(population, rand, size=3):
+    """ Tournament selection.
+
+        Picks `size` individuals of `population` at random and returns the
+        fittest one. `population` is a list of `(genome, fitness)` sorted from
+        the fittest.
+    """
+    picked = [rand.randrange(len(population)) for k in range(size)]
+    return population[min(picked)][0]
+
+def truncation(population, rand, ratio=.5):
+    """ Truncation selection.
+
+        Returns an individual at random among the `ratio` fittest of
+        `population` (a list of `(genome, fitness)` sorted from the fittest).
+    """
+    return population[rand.randrange(max(1, int(ratio * len(population))))][0]
+
+def elitism(population, rand):
+    """ Elitist selection.
+
+        Always returns the fittest individual of `population` (a list of
+        `(genome, fitness)` sorted from the fittest). Mostly useful along with
+        strong mutations.
+    """
+    return population[0][0]
+
+class Evolution:
+    """ An evolutionary loop over a `Generation`.
+
+        The `Evolution` breeds children from the `Genome`s of a `Generation`,
+        has them evaluated by batches and replaces the population, keeping the
+        fitness of every member in `fitness` (the higher the better). Progress
+        is logged in `history` as `(evaluations, best fitness)` per generation.
+
+        Children are bred by `crossover` of two selected parents (or `copy` of
+        one), then go through the `operators` in order. While a batch of
+        children is evaluated, the next batch is bred in a background thread:
+        as breeding holds the GIL, this only pays off when `evaluate` waits on
+        something else (an emulator run through `Genome.start`, a subprocess, a
+        socket...), which is the common case.
+    """
+    SELECTIONS = {
+        "tournament": tournament,
+        "truncation": truncation,
+        "elitism": elitism
+    }
+    RETRIES = 3
+
+    def __init__(self, generation, evaluate, select="tournament",
+                 mode="generational", batchSize=8, elites=1, crossover=.5,
+                 operators=[(1, "mutate", dict(ratio=.001, sigma=1))],
+                 validators=[], repair=False, rand=None):
+        """ Prepares an evolution of `generation`.
+
+            `evaluate` is given a list of `Genome`s and must return the list of
+            their fitness, in the same order:
+            ```
+            evaluate(genomes:Genome[]):float[]
+            ```
+
+            `select` is either the name of a selection in
+            `Evolution.SELECTIONS` or a function:
+            ```
+            select(population:(Genome, float)[], rand:Random):Genome
+            ```
+            where `population` is sorted from the fittest.
+
+            `mode` is either:
+            - `"generational"`: the whole population is replaced by children
+              at every generation, except for the `elites` fittest;
+            - `"steady"`: each batch of children takes the place of the least
+              fit members of the population, if it is better than them.
+
+            `crossover` is the rate of children bred from two parents rather
+            than copied from one. `operators` is a list of `(rate, operator,
+            kwargs)`: each child goes through `operator` with a probability
+            `rate`, `operator` being the name of a `Genome` method or a
+            function called as `operator(child, **kwargs)`. `operators` may
+            also be a `grom.Scheduler`: each child is then bred by one of its
+            arms (and `crossover` is not used), which is credited with the
+            time spent and the fitness gained.
+
+            `validators` is a list of `grom.Validator`s the children must pass
+            to be evaluated: they are screened in bulk once bred (and repaired
+            where possible if `repair` is set), the rejected ones being
+            replaced by new children a few times at most (see
+            `Evolution.RETRIES`). Their reject rates are available through
+            `Validator.report`.
+
+            `rand` is used for every random choice, as well as to seed the
+            children's own random.
+        """
+        self.generation = generation
+        self.evaluate = evaluate
+        self.select = Evolution.SELECTIONS.get(select, select)
+        self.mode = mode
+        self.batchSize = batchSize
+        self.elites = elites
+        self.crossover = crossover
+        self.operators = operators
+        self.validators = validators
+        self.repair = repair
+
+        if not isinstance(rand, grom.util.random.Random):
+            rand = grom.util.random.Random(rand)
+        self.rand = rand
+
+        self.fitness = dict()
+        self.size = len(generation)
+        self.evaluations = 0
+        self.generations = 0
+        self.born = 0
+        self.prefix = "g"
+        self.history = []
+        self.pending = dict()
+
+    def population(self):
+        """ Returns the `(genome, fitness)` of the population, fittest first.
+        """
+        return sorted(((g, self.fitness[n]) for n, g in self.generation),
+                      key=lambda gf: gf[1], reverse=True)
+
+    def best(self):
+        """ Returns the fittest `Genome` of the population and its fitness.
+        """
+        return self.population()[0]
+
+    def breed(self, amount, population):
+        """ Breeds `amount` children from the `population` of parents.
+
+            `population` is a list of `(genome, fitness)` sorted from the
+            fittest, see `Evolution.population`. The children failing the
+            `validators` are replaced, up to `Evolution.RETRIES` times: fewer
+            children may be returned.
+        """
+        children = []
+
+        for k in range(Evolution.RETRIES + 1):
+            bred = [self.child(population)
+                    for k in range(amount - len(children))]
+            if self.validators:
+                bred, rejected = grom.Validator.screen(self.validators, bred,
+                                                       self.repair)
+                self.credit(rejected, [None] * len(rejected))
+
+            children+= bred
+            if len(children) == amount:
+                break
+
+        return children
+
+    def child(self, population):
+        """ Breeds a single child from the `population` of parents.
+
+            Its name is not that of any member, for example from an earlier
+            run over the same `grom.Generation`.
+        """
+        self.born+= 1
+        while self.prefix + str(self.born) in self.generation.genomes:
+            self.born+= 1
+        name = self.prefix + str(self.born)
+
+        a = self.select(population, self.rand)
+        if isinstance(self.operators, grom.Scheduler):
+            return self.scheduled(name, a, population)
+
+        if self.rand.random() < self.crossover:
+            b = self.select(population, self.rand)
+            child = a.crossover(b, name)
+        else:
+            child = a.copy(name)
+        child.rand.seed(self.rand.getrandbits(64))
+        self.generation.adopt(child)
+
+        return Evolution.operate(child, self.operators, self.rand)
+
+    def scheduled(self, name, a, population):
+        """ Breeds a single child from the parent `a` with an arm of the
+            `grom.Scheduler`, timing it.
+
+            The arm and the fitness of the best parent are kept in `pending`
+            until the child is evaluated (see `Evolution.credit`).
+        """
+        k = self.operators.pick(self.rand)
+        operator, kwargs = self.operators.arms[k]
+        st = time.perf_counter()
+
+        parents = [a]
+        if operator == "crossover":
+            kwargs = {k: (v.copy() if isinstance(v, list) else v)
+                      for k, v in kwargs.items()}
+            parents.append(self.select(population, self.rand))
+            child = a.crossover(parents[1], name, **kwargs).pack()
+        else:
+            child = a.copy(name)
+        child.rand.seed(self.rand.getrandbits(64))
+        self.generation.adopt(child)
+
+        if operator != "crossover":
+            Evolution.operate(child, [(1, operator, kwargs)], self.rand)
+
+        fitness = {id(g): f for g, f in population}
+        self.pending[name] = (k, time.perf_counter() - st,
+                              max(fitness[id(p)] for p in parents))
+        return child
+
+    def credit(self, genomes, fitness, share=0):
+        """ Credits the arms of the `grom.Scheduler` that bred `genomes`.
+
+            `fitness` is the list of their fitness (`None` for those that were
+            not evaluated) and `share` the evaluation time of each.
+        """
+        for g, f in zip(genomes, fitness):
+            if g.name in self.pending:
+                k, cost, parent = self.pending.pop(g.name)
+                self.operators.reward(k, cost + share,
+                                      None if f is None else f - parent)
+
+    @staticmethod
+    def operate(genome, operators, rand):
+        """ Runs `genome` through a list of `operators`.
+
+            `operators` is a list of `(rate, operator, kwargs)`, see
+            `Evolution.__init__`; `rand` draws whether each one applies. List
+            arguments are copied first, as operators may modify them. The
+            compressed blocks are packed at the end (see `Genome.pack`).
+        """
+        for rate, operator, kwargs in operators:
+            if rand.random() < rate:
+                kwargs = {k: (v.copy() if isinstance(v, list) else v)
+                          for k, v in kwargs.items()}
+                if callable(operator):
+                    operator(genome, **kwargs)
+                else:
+                    getattr(genome, operator)(**kwargs)
+
+        return genome.pack()
+
+    def score(self, genomes):
+        """ Evaluates `genomes` and records their fitness.
+        """
+        if not genomes:
+            return
+
+        st = time.perf_counter()
+        fitness = self.evaluate(genomes)
+        share = (time.perf_counter() - st) / len(genomes)
+
+        for g, f in zip(genomes, fitness):
+            self.fitness[g.name] = f
+        self.evaluations+= len(genomes)
+        self.credit(genomes, fitness, share)
+
+    def batches(self, total, population):
+        """ Breeds and evaluates `total` children, by batches.
+
+            The next batch is bred while the current one is evaluated. In
+            steady mode, each evaluated batch goes through `Evolution.insert`
+            right away (the batch bred meanwhile had the previous population
+            for parents), otherwise all the children are returned at the end.
+        """
+        sizes = [min(self.batchSize, total - k)
+                 for k in range(0, total, self.batchSize)]
+        done = []
+
+        with futures.ThreadPoolExecutor(1) as ex:
+            batch = self.breed(sizes[0], population) if sizes else []
+            for k in range(len(sizes)):
+                nxt = None
+                if k + 1 < len(sizes):
+                    nxt = ex.submit(self.breed, sizes[k + 1], population)
+
+                self.score(batch)
+                following = nxt.result() if nxt else []
+
+                if self.mode == "steady":
+                    self.insert(batch)
+                    population = self.population()
+                else:
+                    done+= batch
+
+                batch = following
+
+        return done
+
+    def insert(self, children):
+        """ Steady mode: replaces the least fit members by better `children`.
+        """
+        for child in children:
+            worst = min(self.generation.genomes, key=self.fitness.get)
+            if self.fitness[worst] < self.fitness[child.name]:
+                del self.generation.genomes[worst]
+                del self.fitness[worst]
+                self.generation.append(child)
+            else:
+                del self.fitness[child.name]
+
+    def step(self):
+        """ Runs a generation.
+
+            In steady mode, a generation is as many children as there are
+            members in the population, inserted batch by batch.
+            Otherwise, if children were rejected by the `validators`, the
+            fittest members of the previous population take their places.
+        """
+        population = self.population()
+
+        if self.mode == "steady":
+            self.batches(self.size, population)
+        else:
+            elites = population[:self.elites]
+            children = self.batches(self.size - len(elites), population)
+            missing = self.size - len(elites) - len(children) # rejected
+            elites = population[:len(elites) + max(0, missing)]
+
+            self.generation.genomes = {g.name: g for g, f in elites}
+            for child in children:
+                self.generation.append(child)
+            self.fitness = {n: self.fitness[n] for n, g in self.generation}
+
+        self.generations+= 1
+        self.history.append((self.evaluations, self.best()[1]))
+
+        return self
+
+    def run(self, generations=None, evaluations=None, target=None):
+        """ Evolves until a limit is reached.
+
+            Stops after `generations` calls to `Evolution.step`, after
+            `evaluations` evaluations or once a fitness reaches `target`
+            (whichever comes first, any of them may be omitted).
+
+            Fitness values are kept by `Genome` name: raises a `ValueError` if
+            a member of the `grom.Generation` is stored under another name.
+        """
+        named = [n for n, g in self.generation if n != g.name]
+        if named:
+            raise ValueError("Genomes must be stored under their own name "
+                             "(see `Generation.append`): {}".format(
+                             ", ".join(map(repr, named))))
+
+        missing = [g for n, g in self.generation if n not in self.fitness]
+        if missing:
+            self.score(missing)
+
+        pr = grom.util.Progress("Evolving", generations or evaluations or 1)
+        while True:
+            if generations is not None and generations <= self.generations:
+                break
+            if evaluations is not None and evaluations <= self.evaluations:
+                break
+            if target is not None and target <= self.best()[1]:
+                break
+
+            self.step()
+            pr.update(self.generations if generations else self.evaluations)
+        del pr
+
+        return self
+
+    @staticmethod
+    def island(k, base, size, deltas, partition, evaluate, inbox, outbox,
+               results, generations, interval, migrants, settings):
+        """ Runs an island of `Evolution.islands`, in its own process.
+
+            The base data is read from the shared memory block named `base`,
+            the `Genome`s of the island are rebuilt from their `deltas` against
+            it. Every `interval` generations, the `migrants` fittest are sent
+            as deltas through `outbox`, and whatever arrived in `inbox` takes
+            the place of the least fit. The final population is sent back
+            through `results`.
+        """
+        grom.util.DEBUG = False
+
+        shm = shared_memory.SharedMemory(base)
+        data = bytes(shm.buf[:size])
+        shm.close()
+
+        def rebuild(name, delta):
+            g = grom.Genome(data, isData=True, name=name)
+            return g.patch(delta)
+
+        G = grom.Generation(partition)
+        for name, delta in deltas:
+            G.append(rebuild(name, delta))
+
+        e = Evolution(G, evaluate, **settings)
+        e.prefix = "i{}g".format(k) # children names stay unique among islands
+
+        done = 0
+        while done < generations:
+            done = min(done + interval, generations)
+            e.run(generations=done)
+
+            best = e.population()[:migrants]
+            outbox.put([(g.name, g.delta(data), f) for g, f in best])
+
+            while True:
+                try:
+                    arrived = inbox.get_nowait()
+                except queue.Empty:
+                    break
+                for name, delta, f in arrived:
+                    if name in G.genomes:
+                        continue
+                    worst = min(G.genomes, key=e.fitness.get)
+                    if e.fitness[worst] < f:
+                        del G.genomes[worst]
+                        del e.fitness[worst]
+                        G.append(rebuild(name, delta))
+                        e.fitness[name] = f
+
+        outbox.cancel_join_thread() # neighbour may be gone: drop the migrants
+        population = [(g.name, g.delta(data), f) for g, f in e.population()]
+        results.put((k, population, e.history))
+
+    @staticmethod
+    def islands(generation, evaluate, count=None, generations=10, interval=5,
+                migrants=2, base=None, **settings):
+        """ Island-model evolution of `generation` on local processes.
+
+            The population is split among `count` islands (default to the
+            number of cores), each evolving in its own process with an
+            `Evolution` built from `evaluate` and `settings` (see
+            `Evolution.__init__`, `rand` seeds each island differently).
+
+            Islands are arranged in a ring: every `interval` generations, each
+            one sends its `migrants` fittest to the next, and takes in those
+            it received if they are better than its least fit members. Islands
+            never wait on one another.
+
+            The data of `base` (default to the first `Genome` of `generation`)
+            is placed once in shared memory: `Genome`s only ever travel as
+            deltas against it (see `Genome.delta`). `evaluate` must be
+            picklable (i.e. a module-level function) and, on platforms spawning
+            processes (Windows), the calling script must be guarded by
+            `if __name__ == '__main__':`.
+
+            In the end, `generation` is replaced by the union of the islands'
+            populations. Returns the fitness of every `Genome` by name and the
+            `history` of each island.
+        """
+        count = count or grom.util.os.cpu_count() or 1
+        base = base or next(iter(generation))[1]
+        seed = settings.pop("rand", None)
+
+        genomes = [g for n, g in generation]
+        shares = [genomes[k::count] or genomes[:1] for k in range(count)]
+
+        shm = shared_memory.SharedMemory(create=True, size=max(1, base.size))
+        shm.buf[:base.size] = bytes(base.data) # may be a `grom.Rope`
+
+        ctx = multiprocessing.get_context()
+        queues = [ctx.Queue() for k in range(count)]
+        results = ctx.Queue()
+
+        processes = []
+        for k in range(count):
+            deltas = [(g.name, g.delta(base)) for g in shares[k]]
+            rand = None if seed is None else "{}:{}".format(seed, k)
+            args = (k, shm.name, base.size, deltas, generation.partition,
+                    evaluate, queues[k], queues[(k + 1) % count], results,
+                    generations, interval, migrants, dict(settings, rand=rand))
+
+            processes.append(ctx.Process(target=Evolution.island, args=args))
+            processes[-1].start()
+
+        fitness = dict()
+        histories = [None] * count
+        genomes = dict()
+
+        try:
+            pr = grom.util.Progress("Islands", count)
+            for n in range(count):
+                while True:
+                    try:
+                        k, population, history = results.get(timeout=1)
+                        break
+                    except queue.Empty:
+                        if any(p.exitcode for p in processes):
+                            raise RuntimeError("an island process failed")
+
+                histories[k] = history
+                for name, delta, f in population:
+                    g = grom.Genome(base.data, isData=True, name=name)
+                    genomes[name] = g.patch(delta)
+                    fitness[name] = f
+
+                pr.update()
+            del pr
+        finally:
+            for p in processes:
+                if p.exitcode:
+                    p.terminate()
+                p.join()
+            shm.close()
+            shm.unlink()
+
+        generation.genomes = dict()
+        for name, g in genomes.items():
+            generation.append(g)
+
+        return fitness, histories
@@ -0,0 +1,379 @@
+import grom
+import collections
+import hashlib
+import multiprocessing
+import queue
+import socket
+import struct
+import threading
+import time
+import zlib
+from concurrent import futures
+
+class Farm:
+    """ A coordinator spreading evaluations over workers, through TCP.
+
+        Workers (see `Farm.work`) connect to the coordinator, possibly from
+        other machines, each running the evaluation of a few `Genome`s at a
+        time (its `slots`). The data of `base` is sent once to every worker,
+        which keeps it: the `Genome`s then only travel as deltas against it
+        (see `Genome.delta`), and fitness values come back.
+
+        Results are streamed back as they arrive (see `Farm.stream`), and
+        `Farm.evaluate` can be given as is to `grom.Evolution`. A `Genome` is
+        only taken from its source when a worker has a free slot, so that a
+        lazy source (e.g. a `grom.Pipeline`) is not consumed ahead of the
+        workers. When a worker fails (connection lost, `timeout` exceeded),
+        its `Genome`s are sent to the others; a `Genome` failing more than
+        `retries` times (including an exception in the evaluation) raises a
+        `RuntimeError`.
+
+        Workers can be spawned on the local machine as a stand-in (see
+        `Farm.spawn`):
+        ```python
+        with Farm(base) as F:
+            F.spawn(evaluate, 4)
+            G.evolve(F.evaluate, 10)
+        ```
+        On other machines, run `Farm.work(host, port, evaluate)` with the
+        `address` of the coordinator (which should then listen on `host=""`).
+
+        The protocol has no authentication: only use it on a trusted network.
+        Messages are a kind (1 byte) and a length (4 bytes) followed by the
+        content, which is not `pickle`d: fitness values must be numbers.
+    """
+    def __init__(self, base, host="localhost", port=0, retries=2,
+                 timeout=None):
+        """ Listens for workers on `host`:`port` (any free port by default,
+            see `address`), with `base` (a `Genome` or raw data) for the base
+            image.
+        """
+        self.data = bytes(base.data if isinstance(base, grom.Genome)
+                          else base)
+        self.key = hashlib.blake2b(self.data, digest_size=32).digest()
+        self.packed = None
+        self.retries = retries
+        self.timeout = timeout
+
+        self.events = queue.Queue()
+        self.workers = dict()
+        self.processes = []
+        self.jobs = 0
+
+        self.server = socket.create_server((host, port))
+        self.address = self.server.getsockname()[:2]
+        threading.Thread(target=self.accept, daemon=True).start()
+
+    def __str__(self):
+        return "Farm on {}:{} ({} workers)".format(*self.address,
+                                                   len(self.workers))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def send(sock, kind, payload):
+        """ Sends a message of `kind` (one byte).
+        """
+        sock.sendall(struct.pack('!cI', kind, len(payload)) + payload)
+
+    @staticmethod
+    def receive(sock):
+        """ Returns the next message as `(kind, payload)`, or `None` once the
+            connection is closed.
+        """
+        def exactly(n):
+            buf = bytearray()
+            while len(buf) < n:
+                chunk = sock.recv(min(n - len(buf), 0x100000))
+                if not chunk:
+                    return None
+                buf+= chunk
+            return bytes(buf)
+
+        head = exactly(5)
+        if head is None:
+            return None
+        kind, n = struct.unpack('!cI', head)
+        payload = exactly(n)
+
+        return None if payload is None else (kind, payload)
+
+    @staticmethod
+    def job(k, name, key, delta):
+        """ Encodes the job `k`: a `Genome` named `name`, as a `delta`
+            against the base of `key`.
+        """
+        size, runs = delta
+        name = name.encode('utf-8')
+        parts = [struct.pack('!QH', k, len(name)), name, key,
+                 struct.pack('!QI', size, len(runs))]
+        for st, data in runs:
+            parts+= [struct.pack('!QI', st, len(data)), data]
+
+        return b''.join(parts)
+
+    @staticmethod
+    def unjob(payload):
+        """ Decodes a job, see `Farm.job`.
+        """
+        k, n = struct.unpack_from('!QH', payload)
+        name = payload[10:10 + n].decode('utf-8')
+        key = payload[10 + n:42 + n]
+        size, count = struct.unpack_from('!QI', payload, 42 + n)
+
+        runs, at = [], 54 + n
+        for c in range(count):
+            st, n = struct.unpack_from('!QI', payload, at)
+            runs.append((st, payload[at + 12:at + 12 + n]))
+            at+= 12 + n
+
+        return k, name, key, (size, runs)
+
+    def accept(self):
+        """ Accepts the workers, each listened to by a thread of its own.
+        """
+        while True:
+            try:
+                conn, address = self.server.accept()
+            except OSError: # closed
+                return
+            threading.Thread(target=self.listen, args=(conn,),
+                             daemon=True).start()
+
+    def listen(self, conn):
+        """ Turns the messages of a worker into `events`.
+        """
+        try:
+            message = Farm.receive(conn)
+            if message and message[0] == b'H':
+                slots, = struct.unpack_from('!I', message[1])
+                keys = {message[1][k:k + 32]
+                        for k in range(4, len(message[1]), 32)}
+                self.events.put(('join', conn, slots, keys))
+
+                while True:
+                    message = Farm.receive(conn)
+                    if not message:
+                        break
+                    kind, payload = message
+                    k, = struct.unpack_from('!Q', payload)
+                    if kind == b'R':
+                        self.events.put(('result', conn, k,
+                                         struct.unpack_from('!d', payload,
+                                                            8)[0]))
+                    elif kind == b'E':
+                        self.events.put(('error', conn, k,
+                                         payload[8:].decode('utf-8')))
+        except (OSError, struct.error):
+            pass
+        self.events.put(('leave', conn, None, None))
+
+    def drop(self, conn):
+        """ Disconnects a worker (its `Genome`s are then sent to others).
+        """
+        try:
+            conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def dispatch(self, conn, w, k, payload):
+        """ Sends the job `k` to the worker `w`, and the base first if it
+            does not have it.
+        """
+        if self.key not in w['bases']:
+            if self.packed is None:
+                self.packed = zlib.compress(self.data)
+            Farm.send(conn, b'B', self.key + self.packed)
+            w['bases'].add(self.key)
+
+        Farm.send(conn, b'J', payload)
+        w['flying'].add(k)
+
+    def stream(self, genomes):
+        """ Evaluates `genomes` on the workers, yielding `(genome, fitness)`
+            as the results arrive (not in order).
+
+            `genomes` is any iterable of `Genome`s, consumed one at a time as
+            workers free up. Waits for workers if there are none.
+        """
+        todo = iter(genomes)
+        retried = collections.deque() # (k, genome, payload, tries)
+        flying = dict() # k: (genome, payload, tries, conn, start)
+        exhausted = False
+
+        def take():
+            nonlocal exhausted
+            if retried:
+                return retried.popleft()
+
+            genome = None if exhausted else next(todo, None)
+            if genome is None:
+                exhausted = True
+                return None
+
+            self.jobs+= 1
+            return self.jobs, genome, Farm.job(self.jobs, genome.name,
+                                               self.key,
+                                               genome.delta(self.data)), 0
+
+        def fail(k, reason):
+            genome, payload, tries = flying.pop(k)[:3]
+            if self.retries < tries + 1:
+                raise RuntimeError("evaluation of {} failed: {}"
+                                   .format(genome.name, reason))
+            retried.append((k, genome, payload, tries + 1))
+
+        while True:
+            for conn, w in list(self.workers.items()):
+                while len(w['flying']) < w['slots']:
+                    item = take()
+                    if item is None:
+                        break
+                    k, genome, payload, tries = item
+                    flying[k] = (genome, payload, tries, conn,
+                                 time.monotonic())
+                    try:
+                        self.dispatch(conn, w, k, payload)
+                    except OSError:
+                        fail(k, "worker lost")
+                        self.drop(conn)
+                        break
+
+            if exhausted and not retried and not flying:
+                return
+
+            if self.timeout: # whatever the other workers are doing
+                now = time.monotonic()
+                for genome, payload, tries, conn, st in list(flying.values()):
+                    if self.timeout < now - st:
+                        self.drop(conn)
+
+            try:
+                event, conn, k, value = self.events.get(
+                        timeout=self.timeout and min(self.timeout, 1))
+            except queue.Empty:
+                continue
+
+            if event == 'join':
+                self.workers[conn] = dict(slots=max(1, k), bases=value,
+                                          flying=set())
+            elif event == 'leave':
+                w = self.workers.pop(conn, None)
+                conn.close()
+                for k in sorted(w['flying'] if w else ()):
+                    if k in flying:
+                        fail(k, "worker lost")
+            else:
+                if conn in self.workers:
+                    self.workers[conn]['flying'].discard(k)
+                if k not in flying:
+                    continue # from an earlier stream
+                if event == 'result':
+                    yield flying.pop(k)[0], value
+                else:
+                    fail(k, value)
+
+    def evaluate(self, genomes):
+        """ Returns the fitness of `genomes`, in order (as expected by
+            `grom.Evolution`).
+        """
+        genomes = list(genomes)
+        fitness = {id(g): f for g, f in self.stream(genomes)}
+
+        return [fitness[id(g)] for g in genomes]
+
+    def spawn(self, evaluate, count=None, slots=1, threads=False,
+              partition=[]):
+        """ Starts `count` workers on the local machine (default to the
+            number of cores), see `Farm.work` (for `slots` and `partition`).
+
+            Workers are threads if `threads` is set, processes otherwise:
+            `evaluate` must then be picklable (i.e. a module-level function)
+            and, on platforms spawning processes (Windows), the calling script
+            must be guarded by `if __name__ == '__main__':`. They stop with
+            `Farm.close`.
+        """
+        count = count or grom.util.os.cpu_count() or 1
+        args = ("localhost", self.address[1], evaluate, slots, partition)
+
+        for k in range(count):
+            if threads:
+                t = threading.Thread(target=Farm.work, args=args, daemon=True)
+            else:
+                t = multiprocessing.get_context().Process(target=Farm.work,
+                                                          args=args)
+            t.start()
+            self.processes.append(t)
+
+        return self
+
+    def close(self):
+        """ Stops listening and disconnects the workers (which then stop).
+        """
+        self.server.close()
+        for conn in list(self.workers):
+            self.drop(conn)
+        for t in self.processes:
+            t.join(5)
+        self.processes = []
+
+    @staticmethod
+    def work(host, port, evaluate, slots=1, partition=[], attempts=10):
+        """ Runs a worker for the coordinator at `host`:`port`, until it
+            closes the connection.
+
+            `evaluate` is as for `grom.Evolution`, and is given a list of a
+            single `Genome` (of `partition`), evaluating up to `slots` of them
+            at once (in threads). Connecting is tried `attempts` times, a
+            second apart, so that workers can be started before the
+            coordinator. The base images received are kept for the whole run.
+        """
+        grom.util.DEBUG = False
+
+        for k in range(attempts):
+            try:
+                sock = socket.create_connection((host, port))
+                break
+            except OSError:
+                if k == attempts - 1:
+                    raise
+                time.sleep(1)
+
+        bases = dict()
+        lock = threading.Lock()
+
+        def run(payload):
+            k, name, key, delta = Farm.unjob(payload)
+            try:
+                g = grom.Genome(bases[key], isData=True, name=name,
+                                partition=partition)
+                fitness = evaluate([g.patch(delta)])[0]
+                kind, reply = b'R', struct.pack('!Qd', k, fitness)
+            except Exception as e:
+                kind = b'E'
+                reply = struct.pack('!Q', k) + repr(e).encode('utf-8')
+            with lock:
+                try:
+                    Farm.send(sock, kind, reply)
+                except OSError:
+                    pass
+
+        with sock, futures.ThreadPoolExecutor(slots) as ex:
+            Farm.send(sock, b'H', struct.pack('!I', slots))
+            while True:
+                try:
+                    message = Farm.receive(sock)
+                except OSError:
+                    message = None
+                if not message:
+                    break
+
+                kind, payload = message
+                if kind == b'B':
+                    bases[payload[:32]] = zlib.decompress(payload[32:])
+                elif kind == b'J':
+                    ex.submit(run, payload)
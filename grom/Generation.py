@@ -1,9 +1,16 @@
 import grom
+import glob
+import os
+import pickle
+import threading
+import weakref
 
 class Generation: # TODO: test
     """ A `Generation` is `Genome` dictionary, that you can load and save from
         an archive, and is designed to ease `Genome` mass manipulation.
     """
+    REPRESENTATIVES = 4
+
     # START object general
     def __init__(self, partition=[], genomeSize=0):
         # TODO: list members
@@ -14,6 +21,17 @@ class Generation: # TODO: test
         self.genomes = dict()
         self.categories = list()
 
+        self.distanceCache = dict()
+        self.distanced = dict()
+        self.histograms = dict()
+
+        self.checkpointed = dict()
+        self.checkpointBase = None
+        self.checkpointCount = 0
+        self.writer = None
+        self.writerError = None
+        self.writerMarks = dict()
+
         if isinstance(partition, grom.Partition):
             self.partition = partition
         else:
@@ -65,13 +83,22 @@ class Generation: # TODO: test
             if isinstance(multiples, int):
                 multiples = range(multiples)
             for name in multiples: # TODO: `Genome.copy`
-                g = v.copy(str(name)).setPartition(self.partition)
-                self.genomes[str(name)] = g
+                self.genomes[str(name)] = self.adopt(v.copy(str(name)))
         else:
-            self.genomes[v.name] = v.setPartition(self.partition)
+            self.genomes[v.name] = self.adopt(v)
 
         return self
 
+    def adopt(self, g):
+        """ Gives the partition of the `Generation` to `g`, unless their sizes
+            differ (e.g. `g` was resized and its partition shifted, see
+            `Genome.edit`): `g` then keeps its own. Returns `g`.
+        """
+        if not self.partition.size or g.size == self.partition.size:
+            g.setPartition(self.partition)
+
+        return g
+
     def __len__(self):
         """ Returns the number of `Genome` for the `Generation`.
         """
@@ -82,16 +109,22 @@ class Generation: # TODO: test
         """
         return iter(self.genomes.items())
 
-    def categorise(self, delimiter):
+    def categorise(self, delimiter=None, distance=16, samples=256):
         """ Delimits the `Generation` into categories.
 
             The `delimiter` function does not need to necessarily return an
             integer for the categories, but it should have the same output for
             two `Genome` of the same categories.
 
+            If no `delimiter` is given, `Genome`s are grouped into species by
+            similarity instead (see `Generation.speciate`).
+
             Note: maybe this function and the variables surrounding it needs to
             be reworks...
         """
+        if delimiter is None:
+            return self.speciate(distance, samples)
+
         cat = {}
 
         pr = grom.util.Progress("Categorizing", len(self.genomes))
@@ -109,6 +142,82 @@ class Generation: # TODO: test
 
         return self
 
+    def speciate(self, distance=16, samples=256):
+        """ Delimits the `Generation` into species of similar `Genome`s.
+
+            Two `Genome`s are of the same species if their fingerprints (see
+            `Genome.fingerprint`) differ by at most `distance` bytes out of
+            `samples`, or if they are both of the same species as a third one.
+            Fingerprints are sampled at positions drawn from the size of the
+            data (see `grom.Sketch`), so only `Genome`s of the same size are
+            compared: resized ones (see `Genome.insert`) form species apart.
+
+            The fingerprints are cut in `distance + 1` bands: two fingerprints
+            close enough must be equal on at least one of these, so only the
+            `Genome`s sharing a band are ever compared, rather than every pair.
+            Within a band, each `Genome` is only compared to a few members
+            (`Generation.REPRESENTATIVES`) of each species found so far, which
+            keeps it linear when a whole population shares the band (a rare
+            link going through another member may then be missed).
+        """
+        genomes = [g for n, g in self]
+        prints = [g.fingerprint(samples) for g in genomes]
+        parent = list(range(len(genomes)))
+
+        def root(k):
+            while parent[k] != k:
+                parent[k] = parent[parent[k]]
+                k = parent[k]
+            return k
+
+        bands = distance + 1
+        width = -(-samples // bands)
+
+        pr = grom.util.Progress("Speciating", bands)
+        for b in range(bands):
+            buckets = dict()
+            for k in range(len(genomes)):
+                key = (genomes[k].size, prints[k][b * width:(b + 1) * width])
+                buckets.setdefault(key, []).append(k)
+
+            for bucket in buckets.values():
+                groups = dict() # root: a few of its members in the bucket
+                for k in bucket:
+                    for r, members in groups.items():
+                        a, c = root(r), root(k)
+                        if a != c and any(grom.Sketch.distance(prints[m],
+                                prints[k]) <= distance for m in members):
+                            parent[c] = a
+
+                    merged = dict()
+                    for r, members in groups.items():
+                        merged.setdefault(root(r), []).extend(members)
+                    members = merged.setdefault(root(k), [])
+                    if len(members) < Generation.REPRESENTATIVES:
+                        members.append(k)
+                    groups = merged
+
+            pr.update()
+        del pr
+
+        species = dict()
+        for k in range(len(genomes)):
+            species.setdefault(root(k), []).append(genomes[k])
+        self.categories+= list(species.values())
+
+        return self
+
+    def stream(self, only=None):
+        """ Returns a lazy `grom.Pipeline` over the `(name, genome)` items.
+
+            If `only` is provided, the `Genome`s are filtered as with
+            `Generation.select`, but lazily. Unlike `select` and `foreach`, no
+            list is built: see `grom.Pipeline` for the stages. The `Generation`
+            should not be modified while the pipeline runs.
+        """
+        p = grom.Pipeline(iter(self))
+        return p.filter(only) if only else p
+
     def select(self, only): # TODO: comment
         """ Selects `only` some `Genome`s.
 
@@ -153,8 +262,381 @@ class Generation: # TODO: test
         for n, g in self.select(only) if only else self:
             start = do(start, g)
         return start
+
+    def prefilter(self, validators, repair=False):
+        """ Drops the `Genome`s failing any of the `validators`.
+
+            See `grom.Validator.screen`: the validators are run in bulk over
+            the whole `Generation`, and if `repair` is set, the failing
+            `Genome`s are repaired where possible instead of dropped. Returns
+            the names of the dropped `Genome`s; the reject rates are kept by
+            the validators (see `Validator.report`).
+        """
+        names = {id(g): n for n, g in self}
+        kept, rejected = grom.Validator.screen(validators,
+                                               self.genomes.values(), repair)
+        for g in rejected:
+            del self.genomes[names[id(g)]]
+
+        return [names[id(g)] for g in rejected]
     # END genome management
 
+    # START diversity
+    def distances(self, metric="hamming", changed=[], chunkSize=0x100000,
+                  workers=None):
+        """ Pairwise distance matrix of the `Generation`.
+
+            `metric` is one of:
+            - `"hamming"`: the number of differing bytes;
+            - `"partition"`: the number of differing bytes in each partition of
+              the `Generation`'s partition system (a list per pair);
+            - `"histogram"`: the L1 distance between the byte histograms.
+
+            Results are cached per metric: on later calls, only the pairs
+            involving new, replaced or modified `Genome`s (as told by
+            `Genome.version`) are computed again, as well as those involving
+            one of the names listed in `changed`.
+
+            The data are compared `chunkSize` bytes at a time, each chunk being
+            a task for a pool of `workers` processes (see `grom.util.parallel`).
+            On platforms spawning processes (Windows), the calling script must
+            be guarded by `if __name__ == '__main__':`.
+
+            Returns a tuple `(names, matrix)` where `matrix[i][j]` is the
+            distance between the `Genome`s `names[i]` and `names[j]`.
+        """
+        names = list(self.genomes.keys())
+        cache = self.distanceCache.setdefault(metric, dict())
+        seen = self.distanced.setdefault(metric, dict())
+
+        changed = set(changed)
+        for n, g in self:
+            ref, version = seen.get(n, (None, -1))
+            if ref is None or ref() is not g or version != g.version:
+                changed.add(n)
+        self.distanced[metric] = {n: (weakref.ref(g), g.version)
+                                  for n, g in self}
+
+        for pair in list(cache.keys()):
+            if any(n not in self.genomes or n in changed for n in pair):
+                del cache[pair]
+
+        todo = [(names[i], names[j]) for i in range(len(names))
+                for j in range(i + 1, len(names))
+                if frozenset((names[i], names[j])) not in cache]
+
+        if todo:
+            if metric == "histogram":
+                self.histogramDistances(todo, changed, chunkSize, workers)
+            else:
+                self.byteDistances(todo, metric, chunkSize, workers)
+
+        matrix = [[0] * len(names) for n in names]
+        for i in range(len(names)):
+            for j in range(i + 1, len(names)):
+                d = cache[frozenset((names[i], names[j]))]
+                matrix[i][j] = matrix[j][i] = d
+
+        return names, matrix
+
+    def byteDistances(self, todo, metric, chunkSize, workers):
+        """ Computes the Hamming distances of the `todo` pairs into the cache.
+
+            Used by `Generation.distances`, see there for the parameters. For
+            the `"partition"` metric, chunks are cut along the partitions.
+        """
+        involved = list({n for pair in todo for n in pair})
+        index = {n: k for k, n in enumerate(involved)}
+        pairs = [(index[a], index[b]) for a, b in todo]
+        genomes = [self.genomes[n] for n in involved]
+
+        if metric == "partition":
+            parts = [r for n, r in self.partition]
+        else:
+            parts = [range(max(g.size for g in genomes))]
+
+        chunks = [(k, st, min(st + chunkSize, r[-1] + 1))
+                  for k, r in enumerate(parts) if len(r)
+                  for st in range(r[0], r[-1] + 1, chunkSize)]
+        tasks = (([g.data[st:ed] for g in genomes], pairs)
+                 for k, st, ed in chunks)
+
+        sums = [[0] * len(parts) for p in pairs]
+
+        pr = grom.util.Progress("Distances", len(chunks))
+        results = grom.util.parallel(grom.util.distances, tasks, workers)
+        for (k, st, ed), counts in zip(chunks, results):
+            for p in range(len(pairs)):
+                sums[p][k]+= counts[p]
+
+            pr.update()
+        del pr
+
+        cache = self.distanceCache[metric]
+        for (a, b), s in zip(todo, sums):
+            cache[frozenset((a, b))] = s if metric == "partition" else s[0]
+
+    def histogramDistances(self, todo, changed, chunkSize, workers):
+        """ Computes the histogram distances of the `todo` pairs into the cache.
+
+            Used by `Generation.distances`, see there for the parameters. Byte
+            histograms are kept in `Generation.histograms` and only computed
+            again for new and `changed` `Genome`s.
+        """
+        for n in list(self.histograms.keys()):
+            if n not in self.genomes or n in changed:
+                del self.histograms[n]
+
+        missing = list({n for pair in todo for n in pair
+                        if n not in self.histograms})
+        chunks = [(n, st) for n in missing
+                  for st in range(0, self.genomes[n].size, chunkSize)]
+        tasks = ((self.genomes[n].data[st:st + chunkSize],) for n, st in chunks)
+
+        for n in missing:
+            self.histograms[n] = [0] * 256
+
+        pr = grom.util.Progress("Histograms", len(chunks))
+        results = grom.util.parallel(grom.util.histogram, tasks, workers)
+        for (n, st), counts in zip(chunks, results):
+            h = self.histograms[n]
+            for v in range(256):
+                h[v]+= counts[v]
+
+            pr.update()
+        del pr
+
+        cache = self.distanceCache["histogram"]
+        for a, b in todo:
+            ha, hb = self.histograms[a], self.histograms[b]
+            cache[frozenset((a, b))] = sum(abs(x - y) for x, y in zip(ha, hb))
+    # END diversity
+
+    # START evolution
+    def evolve(self, evaluate, generations=None, evaluations=None, target=None,
+               **settings):
+        """ Evolves the `Generation` with a `grom.Evolution`.
+
+            `evaluate` and any other keyword argument are given to the
+            `grom.Evolution` constructor, the limits are given to
+            `Evolution.run`. The population is modified in place.
+
+            Returns the `grom.Evolution`, which holds the fitness of the
+            `Genome`s and the history of the run (for example to `run` again).
+        """
+        e = grom.Evolution(self, evaluate, **settings)
+        return e.run(generations, evaluations, target)
+
+    def heatmap(self, fitness, prior=.1):
+        """ Combines the edit maps of the `Genome`s with their fitness.
+
+            `fitness` maps the names of the `Genome`s to their fitness (e.g.
+            `Evolution.fitness`); only the `Genome`s keeping a map (see
+            `Genome.attribute`) are taken into account. Returns a
+            `grom.Attribution` of weights, to give to `Genome.mutate` (see
+            `Attribution.heatmap`):
+            ```python
+            E = G.evolve(evaluate, 10)
+            hot = G.heatmap(E.fitness)
+            G.foreach(lambda g: g.mutate(.001, 1, heatmap=hot))
+            ```
+        """
+        scored = [(g.attribution, fitness[n]) for n, g in self
+                  if g.attribution and n in fitness]
+
+        return grom.Attribution.heatmap([m for m, f in scored],
+                                        [f for m, f in scored], prior)
+
+    def islands(self, evaluate, count=None, generations=10, **settings):
+        """ Evolves the `Generation` on `count` islands (local processes).
+
+            See `grom.Evolution.islands` for details and the other keyword
+            arguments. The population is replaced in place.
+
+            Returns the fitness of every `Genome` of the final population.
+        """
+        return grom.Evolution.islands(self, evaluate, count, generations,
+                                      **settings)[0]
+    # END evolution
+
+    # START file management
+    def load(self, files, workers=None):
+        """ Loads `Genome`s from many files at once.
+
+            `files` is either a directory (all the files in it), a glob pattern
+            (e.g. `"dump/*.gb"`) or a list of paths. Each file is loaded into a
+            `Genome` named after it (see `Genome.load`) on a pool of `workers`
+            threads (default to the number of cores, see `grom.util.parallel`),
+            then appended to the `Generation`.
+        """
+        if isinstance(files, str):
+            if os.path.isdir(files):
+                files = [os.path.join(files, f) for f in os.listdir(files)]
+                files = sorted(f for f in files if os.path.isfile(f))
+            else:
+                files = sorted(glob.glob(files))
+
+        def load(path):
+            return grom.Genome(path, name=os.path.basename(path))
+
+        pr = grom.util.Progress("Loading files", len(files))
+        tasks = ((f,) for f in files)
+        for g in grom.util.parallel(load, tasks, workers, threads=True):
+            self.append(g)
+            pr.update()
+        del pr
+
+        return self
+
+    def save(self, directory, workers=None):
+        """ Saves every `Genome` into `directory`, in parallel.
+
+            Each `Genome` is saved under its name in the `Generation`, on a
+            pool of `workers` threads (default to the number of cores). As
+            `Genome.save` does, only the bytes that changed since loading are
+            written when possible, the rest being copied by the kernel.
+        """
+        os.makedirs(directory, exist_ok=True)
+
+        def save(n, g):
+            g.save(os.path.join(directory, str(n)))
+
+        pr = grom.util.Progress("Saving files", len(self))
+        for r in grom.util.parallel(save, iter(self), workers, threads=True):
+            pr.update()
+        del pr
+
+        return self
+    # END file management
+
+    # START checkpoints
+    def checkpoint(self, path, meta=None):
+        """ Writes an incremental checkpoint of the `Generation` in `path`.
+
+            `path` is a directory, one file is added to it per checkpoint. The
+            first one holds the base data (that of the first `Genome`), each
+            `Genome` is stored as a delta against it (see `Genome.delta`), and
+            only if it was modified (or added) since the previous checkpoint.
+            The random state of every `Genome`, the partition system (and that
+            of every `Genome` not using it, e.g. resized ones) and `meta`
+            (anything picklable, for example the state of a `grom.Evolution`)
+            are stored every time.
+
+            The deltas are computed (a pass over the data of each modified
+            `Genome`) and pickled on the calling thread: only the file is
+            written by a background thread. The next checkpoint waits for it,
+            `Generation.flush` waits explicitly (both raise the error of a
+            failed write). The `Genome`s are only considered checkpointed once
+            the file is written. Raises a `ValueError` if the `Generation` is
+            empty (there is no base yet).
+        """
+        self.flush()
+
+        if self.checkpointBase is None:
+            if not self.genomes:
+                raise ValueError("cannot checkpoint an empty Generation")
+            self.checkpointBase = bytes(next(iter(self))[1].data)
+
+        changed, marks = dict(), dict()
+        for n, g in self:
+            ref, version = self.checkpointed.get(n, (None, -1))
+            if ref is None or ref() is not g or version != g.version:
+                changed[n] = g.delta(self.checkpointBase)
+                marks[n] = (weakref.ref(g), g.version)
+
+        for n in list(self.checkpointed.keys()):
+            if n not in self.genomes:
+                del self.checkpointed[n]
+
+        state = dict(
+                names = list(self.genomes.keys()),
+                genomes = changed,
+                rands = {n: g.rand.getstate() for n, g in self},
+                partition = self.partition,
+                partitions = {n: g.partition for n, g in self
+                              if g.partition is not self.partition},
+                meta = meta
+            )
+        if not self.checkpointCount:
+            state['base'] = self.checkpointBase
+
+        file = os.path.join(path, "{:06}.grom".format(self.checkpointCount))
+        data = pickle.dumps(state, pickle.HIGHEST_PROTOCOL)
+
+        def write():
+            try:
+                os.makedirs(path, exist_ok=True)
+                with open(file + ".tmp", 'wb') as f:
+                    f.write(data)
+                os.replace(file + ".tmp", file)
+            except BaseException as e:
+                self.writerError = e
+
+        self.writerMarks = marks
+        self.writer = threading.Thread(target=write)
+        self.writer.start()
+
+        return self
+
+    def flush(self):
+        """ Waits for the checkpoint being written in background, if any.
+
+            Raises the error of the write if it failed: the `Genome`s it held
+            are then written again by the next checkpoint.
+        """
+        if self.writer:
+            self.writer.join()
+            self.writer = None
+
+            error, self.writerError = self.writerError, None
+            if error is not None:
+                raise error
+            self.checkpointed.update(self.writerMarks)
+            self.checkpointCount+= 1
+
+        return self
+
+    @staticmethod
+    def resume(path):
+        """ Restores a `Generation` from the checkpoints in `path`.
+
+            Every `Genome` is brought back as of the last checkpoint, with the
+            same name, data, partition and random state (so it makes the same
+            next random draws). Further checkpoints can be written to the same
+            `path`.
+
+            Returns the `Generation` and the `meta` given to the last
+            `Generation.checkpoint`. Checkpoints are unpickled: only resume from
+            trusted files.
+        """
+        files = sorted(f for f in os.listdir(path) if f.endswith(".grom"))
+
+        base, deltas = None, dict()
+        pr = grom.util.Progress("Resuming", len(files))
+        for name in files:
+            with open(os.path.join(path, name), 'rb') as f:
+                state = pickle.load(f)
+            base = state.get('base', base)
+            deltas.update(state['genomes'])
+
+            pr.update()
+        del pr
+
+        G = Generation(state['partition'])
+        for n in state['names']:
+            g = grom.Genome(base, isData=True, name=n).patch(deltas[n])
+            g.rand.setstate(state['rands'][n])
+            G.append(g)
+            if n in state.get('partitions', ()): # not in older checkpoints
+                g.partition = state['partitions'][n]
+            G.checkpointed[n] = (weakref.ref(g), g.version)
+
+        G.checkpointBase = base
+        G.checkpointCount = len(files)
+
+        return G, state['meta']
+    # END checkpoints
+
     # START mass data modification
     """ Nothing to implement yet...
 
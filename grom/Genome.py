@@ -1,4 +1,13 @@
 import grom
+import bisect
+import contextlib
+import math
+import os
+import random
+import re
+import stat
+import weakref
+import zlib
 
 class Genome:
     """ A `Genome` is a `bytearray`, often loaded from file, on which you can
@@ -7,8 +16,15 @@ class Genome:
         `partition` designate a full `grom.Partition` system or a list of
         `tuples(str, int)`.
         `part` is always a list of partition identifiers (either `str` names or
-        `int` ID).
+        `int` ID), `range`s or `grom.Selection`s, see `Partition.resolve`.
     """
+    # edited ranges kept for `Genome.saveChanges`, before a full write instead
+    CHANGES = 0x1000
+
+    # byte classes for content-defined chunking, see `Genome.anchors`
+    CLASSES = bytes(0x30 + c for c in
+                    random.Random(0x67726F6D).choices(range(4), k=256))
+
     # START object general
     def __init__(self, file, isData=False, name=None, rand=None, partition=[]):
         # TODO: list members
@@ -26,9 +42,26 @@ class Genome:
             For more information about data loading see `Genome.load`.
         """
         self.name = name or "noname"
+        self.watchers = []
+        self.version = 0
+        self.journal = []
+        self.savepoints = []
+        self.unshifted = None
+        self.anchorCache = None
+        self.alignCache = dict()
+        self.checksums = []
+        self.pointers = []
+        self.compressed = dict()
+        self.blocks = dict()
+        self.packing = False
+        self.source = None
+        self.changes = None
+        self.sketch = None
+        self.searchIndex = None
+        self.attribution = None
 
         pr = grom.util.Progress("Loading data")
-        self.load(file, name, isData)
+        self.load(file, isData, name)
         del pr
 
         if not isinstance(rand, grom.util.random.Random):
@@ -38,7 +71,22 @@ class Genome:
         self.setPartition(partition)
 
     def copy(self, name=None):
-        return Genome(self.data, isData=True, name=name or self.name + "_copy")
+        self.pack()
+        g = Genome(self.data, isData=True, name=name or self.name + "_copy")
+        g.partition = self.partition
+        if self.sketch:
+            g.sketch = self.sketch.copy(g)
+        if self.attribution:
+            g.attribution = self.attribution.copy().attach(g)
+        g.checksums = [c.copy().attach(g, False) for c in self.checksums]
+        g.pointers = [p.copy().attach(g, False) for p in self.pointers]
+        if self.compressed:
+            g.compressed = self.compressed.copy()
+            g.watchers.append(g.touchBlocks)
+        if self.changes is not None:
+            g.source, g.changes = self.source, self.changes.copy()
+
+        return g
 
     def setPartition(self, partition):
         if isinstance(partition, grom.Partition):
@@ -50,6 +98,52 @@ class Genome:
 
     def __str__(self):
         return "Genome {} (size: {:,}b)".format(self.name, self.size)
+
+    def fingerprint(self, samples=256):
+        """ Similarity fingerprint of the data.
+
+            The `grom.Sketch` of the data is taken on the first call, then kept
+            up to date through the edits. Similar `Genome`s get fingerprints
+            differing by few bytes (see `grom.Sketch.distance`).
+        """
+        if not self.sketch or self.sketch.samples != samples:
+            if self.sketch:
+                self.watchers.remove(self.sketch.touch)
+            self.sketch = grom.Sketch(self, samples)
+
+        return self.sketch.fingerprint()
+
+    def index(self, n=3):
+        """ Search index over the data.
+
+            The `grom.Index` (of grams of `n` bytes) is created on the first
+            call, then kept up to date through the edits, so that repeated
+            searches are cheap:
+            ```python
+            g.index().find(b'POKEMON')
+            g.index().relative("PIKACHU")
+            ```
+        """
+        if not self.searchIndex or self.searchIndex.n != n:
+            if self.searchIndex:
+                self.watchers.remove(self.searchIndex.touch)
+            self.searchIndex = grom.Index(self, n)
+
+        return self.searchIndex
+
+    def attribute(self, block=0x100):
+        """ Counts the edits of the data, by blocks of `block` bytes.
+
+            The `grom.Attribution` map is created on the first call, then kept
+            up to date through the edits and inherited by the children of
+            `copy` and `crossover`. See `Generation.heatmap`.
+        """
+        if not self.attribution or self.attribution.block != block:
+            if self.attribution:
+                self.watchers.remove(self.attribution.touch)
+            self.attribution = grom.Attribution(block).attach(self)
+
+        return self.attribution
     # END object general
 
     # START file management
@@ -72,6 +166,11 @@ class Genome:
             if `file` is a `str`, it use the `'ascii'` encoding.
 
             Finally, if `file` if `None`, try to load `self.name` as a file.
+
+            Regular files are read straight into a buffer of the right size,
+            and remembered as the `source` of the data: as long as its size
+            does not change, the ranges edited since are tracked so that
+            `Genome.save` can only write those (see there).
         """
         if name:
             self.name = name
@@ -80,20 +179,56 @@ class Genome:
             file = self.name
             isData = False
 
+        self.source, self.changes = None, None
+
         if not isData:
             if isinstance(file, str):
                 file = open(file, 'rb')
 
-            self.data = bytearray(file.read())
+            try:
+                info = os.fstat(file.fileno())
+                if not stat.S_ISREG(info.st_mode): # pipe, FIFO...
+                    raise OSError("not a regular file")
+                self.data = bytearray(info.st_size)
+                view, k = memoryview(self.data), 0
+                while k < info.st_size:
+                    n = file.readinto(view[k:])
+                    if not n:
+                        raise EOFError("file shrank while loading")
+                    k+= n
+                view.release()
+
+                self.source = (file.name, info.st_size, info.st_mtime_ns)
+                self.changes = []
+            except (AttributeError, OSError): # not a regular file
+                self.data = bytearray(file.read())
             file.close() # USL?
         else:
             if isinstance(file, str):
                 self.data = bytearray(file, 'ascii')
+            elif isinstance(file, grom.Rope):
+                self.data = bytearray(bytes(file))
             else:
                 self.data = bytearray(file)
 
         self.size = len(self.data)
         self.partition = grom.Partition(self.size)
+        self.version+= 1
+
+        if self.sketch:
+            self.watchers.remove(self.sketch.touch)
+            self.sketch = None
+        if self.searchIndex:
+            self.watchers.remove(self.searchIndex.touch)
+            self.searchIndex = None
+        if self.attribution:
+            self.watchers.remove(self.attribution.touch)
+            self.attribution = None
+        for c in self.checksums:
+            c.sum = c.total()
+        for p in self.pointers:
+            p.rescan()
+        self.blocks = dict()
 
     def save(self, file=None):
         """ Save the `Genome` into a file.
@@ -104,11 +239,83 @@ class Genome:
             If the `file` parameter is of `str`, the data are loaded into the
             file it indicate (file is overwritten in `'wb'`). Otherwise, use
             `write` from the object with the data (`bytearray`).
+
+            Compressed blocks are packed and checksums are fixed beforehand
+            (see `Genome.pack` and `Genome.addChecksum`). When saving to a
+            path, only the changes may be written, see `Genome.saveChanges`.
         """
+        self.pack().materialize().fixChecksums()
+
+        file = file or self.name
         if isinstance(file, str):
+            if self.saveChanges(file):
+                return self
             file = open(file, 'wb')
 
-        (file or open(self.name, 'wb')).write(self.data)
+        file.write(self.data)
+
+        return self
+
+    def saveChanges(self, file):
+        """ Saves into the file `file` only what changed since loading.
+
+            If the `source` file the data was loaded from is unchanged and the
+            size of the data is the same, the source is copied by the kernel
+            (see `grom.util.copyFile`), then only the edited ranges are written
+            over it. When `file` is the source itself, nothing is copied.
+
+            Returns `False` (having done nothing) if this is not possible.
+        """
+        if not self.source or self.changes is None:
+            return False
+
+        path, size, mtime = self.source
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        if (stat.st_size, stat.st_mtime_ns) != (size, mtime) or \
+                size != self.size:
+            return False
+
+        same = os.path.exists(file) and os.path.samefile(path, file)
+        with open(file, 'r+b' if same else 'wb') as dst:
+            if not same:
+                with open(path, 'rb') as src:
+                    grom.util.copyFile(src, dst, size)
+
+            for st, ed in Genome.merged(self.changes):
+                dst.seek(st)
+                dst.write(self.data[st:ed])
+
+        if same:
+            self.source = (path, size, os.stat(path).st_mtime_ns)
+            self.changes = []
+
+        return True
+
+    @staticmethod
+    def merged(changes):
+        """ Sorts and merges the edited ranges of `changes`, those closer than
+            0x1000 bytes becoming a single write.
+        """
+        merged = []
+        for st, ed in sorted(changes):
+            if merged and st <= merged[-1][1] + 0x1000:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], ed))
+            else:
+                merged.append((st, ed))
+
+        return merged
+
+    def materialize(self):
+        """ Turns the data back into a contiguous `bytearray`.
+
+            After insertions or deletions, the data is kept as a `grom.Rope`;
+            this is called by `Genome.save`.
+        """
+        if isinstance(self.data, grom.Rope):
+            self.data = bytearray(bytes(self.data))
 
         return self
 
@@ -155,6 +362,508 @@ class Genome:
         return self.save(file).start(file, com, pause)
     # END file management
 
+    # START checksums
+    def addChecksum(self, *handlers):
+        """ Maintains checksums stored in the data.
+
+            Each handler is a `grom.Checksum`, for example:
+            ```python
+            g.addChecksum(Checksum.gbHeader(), Checksum.gbGlobal())
+            ```
+            They are kept up to date incrementally with every edit, copied
+            along to the children of `copy` and `crossover`, and fixed in the
+            data by `Genome.save` (in the order they were added).
+        """
+        for c in handlers:
+            self.checksums.append(c.attach(self))
+
+        return self
+
+    def fixChecksums(self, verify=False):
+        """ Writes the expected value of every checksum into the data.
+
+            If `verify` is set, each incrementally maintained checksum is first
+            checked against a full computation, raising a `ValueError` if they
+            disagree (this costs a pass over the data).
+        """
+        for c in self.checksums:
+            if verify and not c.verify()[0]:
+                raise ValueError("{} went out of sync".format(c))
+            c.fix()
+
+        return self
+
+    def verifyChecksums(self):
+        """ Checks every checksum against the data, without fixing anything.
+
+            Returns a list of `(checksum, inSync, valid)`: see
+            `Checksum.verify`.
+        """
+        return [(c,) + c.verify() for c in self.checksums]
+    # END checksums
+
+    # START pointers
+    def indexPointers(self, *indexes):
+        """ Maintains indexes of the pointers found in the data.
+
+            Each index is a `grom.Pointers`, for example:
+            ```python
+            g.indexPointers(Pointers.gb(['Move Names', 'Item Names']))
+            ```
+            They are kept up to date with every edit, copied along to the
+            children of `copy` and `crossover`, and used by `Genome.relocate`.
+        """
+        for p in indexes:
+            self.pointers.append(p.attach(self))
+
+        return self
+
+    def relocate(self, st, ed, to, filler=None):
+        """ Moves the data from `st` to `ed` (excluded) to `to`.
+
+            Every pointer (of every index, see `Genome.indexPointers`) into the
+            moved data is rewritten to follow it; pointers within the moved
+            data move along (and are encoded again for their new place). The
+            destination is added to the targets of the indexes, so that the
+            pointers stay indexed. If `filler` is given, what the data left is
+            filled with it.
+
+            Raises a `ValueError`, before anything is modified, if a pointer
+            can not point to the new place (e.g. a GB pointer to another bank).
+        """
+        size = ed - st
+        rewrite = []
+        for index in self.pointers:
+            for at, t in index:
+                moved = st <= at and at + index.width <= ed
+                if not moved and to < at + index.width and at < to + size:
+                    continue # overwritten
+                if st <= t < ed:
+                    t+= to - st
+                elif not moved:
+                    continue
+                at+= to - st if moved else 0
+
+                word = index.encode(t, at)
+                if word is None:
+                    raise ValueError("{} can not point from 0x{:X} to 0x{:X}"
+                                     .format(index, at, t))
+                rewrite.append((at, word))
+
+        for index in self.pointers:
+            index.part.append(range(to, to + size))
+
+        data = self.data[st:ed]
+        if filler is not None:
+            self.edit(st, ed, bytes((filler,)) * size)
+        self.edit(to, to + size, data)
+        for at, word in rewrite:
+            self.edit(at, at + len(word), word)
+
+        return self
+    # END pointers
+
+    # START compressed blocks
+    def addCompressed(self, compression, *names):
+        """ Marks the partitions `names` as blocks compressed as `compression`.
+
+            `compression` is a `grom.Compression`, for example:
+            ```python
+            g.addCompressed(Compression.lz77(), 'Title Tiles', 'Font')
+            ```
+            The operators `mutate`, `geneswap` and `apply` then work on the
+            expanded data of those partitions when they are named in `part`,
+            or when `part` is empty (see `Genome.block`). No operator modifies
+            their compressed bytes otherwise, as it would only garble them
+            (see `Genome.ranges`). `copy` and `crossover` carry the marks over.
+        """
+        if not self.compressed:
+            self.watchers.append(self.touchBlocks)
+        for n in names:
+            self.compressed[n] = compression
+
+        return self
+
+    def block(self, name):
+        """ Returns the expanded data of the compressed partition `name`, as a
+            `Genome` (sharing this one's random).
+
+            It is expanded once (and most likely found in the cache shared by
+            all the `Genome`s, see `grom.Compression`), then kept: further
+            operations on the block modify it in the expanded domain. The
+            modified blocks are recompressed all at once by `Genome.pack`.
+
+            An edit of the compressed bytes themselves (e.g. by `crossover`)
+            drops the expanded block, modifications included.
+        """
+        if name not in self.blocks:
+            expanded = self.compressed[name].expand(bytes(self[name]))
+            b = Genome(expanded, True, "{}[{}]".format(self.name, name))
+            self.blocks[name] = (b, b.version)
+
+        b = self.blocks[name][0]
+        b.rand = self.rand
+
+        return b
+
+    def splitBlocks(self, part):
+        """ Splits `part` into the expanded blocks of the compressed partitions
+            it names (all of them if it is empty, see `Genome.block`) and the
+            ranges of what is left of it (see `Genome.ranges`).
+        """
+        if not self.compressed:
+            return [], self.ranges(part)
+        if not part:
+            return [self.block(p) for p in self.compressed], self.ranges(part)
+
+        named = [p for p in part if isinstance(p, str) and p in self.compressed]
+        rest = [p for p in part if p not in named]
+        return [self.block(p) for p in named], \
+               self.ranges(rest) if rest else []
+
+    def touchBlocks(self, genome, st, old, new):
+        """ Watcher dropping the expanded blocks whose bytes were edited.
+        """
+        if self.packing or not self.blocks:
+            return
+
+        # as of before the edit, the partition may have been shifted since
+        partition = self.unshifted if len(old) != len(new) else self.partition
+        ed = st + max(len(old), 1)
+        for name in list(self.blocks):
+            r = partition[name]
+            if st < r.stop and r.start < ed:
+                del self.blocks[name]
+
+    def pack(self):
+        """ Recompresses the expanded blocks that were modified.
+
+            Each block is written at the start of its partition. A block that
+            does not fit in its partition anymore is left as it was (the edits
+            of its expanded data are dropped), so that nothing after it ever
+            moves. This is done by `Genome.save`, `Genome.copy` and
+            `Evolution.operate`: operations on the blocks in between are
+            batched.
+        """
+        self.packing = True
+        try:
+            for name, (b, version) in self.blocks.items():
+                if b.version == version:
+                    continue
+
+                compression = self.compressed[name]
+                expanded = bytes(b.data)
+                data = compression.compress(expanded)
+
+                r = self.partition[name]
+                if len(r) < len(data):
+                    grom.util.output("Block {} does not fit anymore ({} > {}),"
+                                     " kept as is".format(name, len(data),
+                                                          len(r)))
+                    continue
+                self.edit(r.start, r.start + len(data), data)
+
+                grom.Compression.remember(compression.key(bytes(self[name])),
+                                          expanded)
+        finally:
+            self.packing = False
+
+        self.blocks = dict()
+        return self
+    # END compressed blocks
+
+    # START deltas
+    def delta(self, base):
+        """ Differences from `base`, in a compact form.
+
+            `base` is a `Genome` or raw data. Returns a tuple `(size, runs)`
+            where `runs` is a list of `(offset, bytes)`: the data is `base`,
+            resized to `size`, with each `bytes` written at its `offset`. Runs
+            only separated by a few identical bytes are merged together.
+
+            The comparison runs at C speed (see `grom.util.hamming`), so this
+            is much cheaper to compute and to send around than a full copy.
+        """
+        base = base.data if isinstance(base, Genome) else base
+        n = min(self.size, len(base))
+
+        x = int.from_bytes(self.data[:n], 'little') ^ \
+            int.from_bytes(base[:n], 'little')
+        x = x.to_bytes(n, 'little')
+
+        runs = [(m.start(), bytes(self.data[m.start():m.end()]))
+                for m in re.finditer(rb'[^\x00]+(?:\x00{1,8}[^\x00]+)*', x)]
+        if n < self.size:
+            runs.append((n, bytes(self.data[n:])))
+
+        return self.size, runs
+
+    def patch(self, delta):
+        """ Applies a `delta` (see `Genome.delta`) onto this `Genome`.
+
+            The data should be that of the `base` the delta was computed from.
+        """
+        size, runs = delta
+        if size < self.size:
+            self.edit(size, self.size, b'')
+
+        for st, data in runs:
+            self.edit(st, st + len(data), data)
+
+        return self
+    # END deltas
+
+    # START transactions
+    def begin(self):
+        """ Starts a transaction (or a savepoint within one).
+
+            From now on, every edit records the bytes it overwrites, so that
+            `Genome.rollback` can undo them in time proportional to the amount
+            of data changed, rather than the size of the `Genome`. Transactions
+            can be nested: each `begin` must be matched by either a `commit` or
+            a `rollback`, which only concerns the edits since this `begin`.
+
+            The expanded compressed blocks are packed first (see `Genome.pack`),
+            so that their modifications since are dropped by a rollback.
+        """
+        self.pack()
+        if not self.savepoints:
+            self.watchers.append(self.record)
+        self.savepoints.append(len(self.journal))
+
+        return self
+
+    def record(self, genome, st, old, new):
+        """ Watcher appending an edit to the `journal` of the transaction.
+
+            An edit changing the size also records the partition from before
+            it (see `Genome.resized`), as shifting it back cannot restore the
+            ranges it clamped.
+        """
+        partition = self.unshifted if len(old) != len(new) else None
+        self.journal.append((st, old, len(new), partition))
+
+    def commit(self):
+        """ Keeps the edits since the last `Genome.begin`.
+
+            Within a nested transaction, the edits are still undone if an
+            enclosing transaction is rolled back.
+        """
+        self.savepoints.pop()
+        if not self.savepoints:
+            self.watchers.remove(self.record)
+            self.journal = []
+
+        return self
+
+    def rollback(self):
+        """ Undoes every edit since the last `Genome.begin`.
+
+            Undoing goes through `Genome.edit` like any other change, so other
+            watchers (see `Genome.fingerprint`) stay up to date. Note that the
+            random state of the `Genome` is not restored.
+        """
+        k = self.savepoints[-1]
+        undo, self.journal = self.journal[k:], self.journal[:k]
+
+        self.watchers.remove(self.record)
+        for st, old, size, partition in reversed(undo):
+            self.edit(st, st + size, old)
+            if partition is not None:
+                self.partition = partition
+        self.watchers.append(self.record)
+        self.blocks = dict() # all expanded since `Genome.begin`
+
+        return self.commit()
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """ Context manager around `Genome.begin`.
+
+            Commits when the block ends normally, rolls back if it raises:
+            ```python
+            with g.transaction():
+                g.mutate(.001, 1)
+                if not better(g):
+                    raise ...
+            ```
+        """
+        self.begin()
+        try:
+            yield self
+        except:
+            self.rollback()
+            raise
+        self.commit()
+    # END transactions
+
+    # START alignment
+    def anchors(self, average=0x1000):
+        """ Cuts the data into content-defined chunks.
+
+            Each byte is mapped to one of 4 classes (`Genome.CLASSES`), and a
+            chunk ends wherever the classes of the last few bytes form a given
+            pattern, long enough for chunks to be of about `average` bytes. As
+            bounds only depend on the surrounding bytes, inserting or deleting
+            data only changes the chunks around the edit. Both the mapping
+            (`bytes.translate`) and the search (`re`) run at C speed.
+
+            Chunks are never longer than 8 times `average`. Returns a list of
+            `(start, end, key)`, `key` being the same for identical chunks.
+            The result is kept until the data is modified.
+        """
+        if self.anchorCache and self.anchorCache[:2] == (self.version, average):
+            return self.anchorCache[2]
+
+        window = max(1, round(math.log(average, 4)))
+        pattern = b'0' + b'1' * (window - 1) # never overlaps itself
+        data = self.data[:]
+
+        cuts = [m.end() for m in re.finditer(pattern, data.translate(
+                Genome.CLASSES))] + [self.size]
+
+        chunks, st = [], 0
+        for ed in cuts:
+            while st < ed:
+                n = min(ed, st + 8 * average)
+                chunks.append((st, n, (n - st, zlib.crc32(data[st:n]))))
+                st = n
+
+        self.anchorCache = (self.version, average, chunks)
+        return chunks
+
+    def align(self, mate, average=0x1000):
+        """ Finds the regions shared by this `Genome` and `mate`.
+
+            Both are cut into chunks (see `Genome.anchors`). Chunks appearing
+            exactly once in both serve as anchors: the longest series of them
+            in the same order on both sides is kept (patience diff), then each
+            anchor is extended to identical neighbouring chunks. This takes
+            near-linear time, and works for data of different sizes or with
+            shifted content (e.g. two revisions of a ROM).
+
+            Returns a sorted list of `(start, mateStart, length)`: the data of
+            `self` from `start` is the same as that of `mate` from `mateStart`
+            for `length` bytes. The result is cached until either changes.
+        """
+        key = id(mate)
+        ref, versions, segments = self.alignCache.get(key, (None, 0, None))
+        if ref and ref() is mate and versions == (self.version, mate.version,
+                                                  average):
+            return segments
+
+        a, b = self.anchors(average), mate.anchors(average)
+
+        counts = dict()
+        for st, ed, k in a:
+            counts[k] = counts.get(k, 0) + 1
+        for st, ed, k in b:
+            counts[k] = counts.get(k, 0) + 0x10000
+        indexB = {k: j for j, (st, ed, k) in enumerate(b)
+                  if counts[k] == 0x10001}
+        unique = [(i, indexB[k]) for i, (st, ed, k) in enumerate(a)
+                  if counts[k] == 0x10001]
+
+        # longest increasing subsequence of `unique` on the `mate` side
+        tails, links, ends = [], [None] * len(unique), []
+        for n, (i, j) in enumerate(unique):
+            t = bisect.bisect_left(tails, j)
+            links[n] = ends[t - 1] if t else None
+            tails[t:t + 1], ends[t:t + 1] = [j], [n]
+        pairs, n = [], ends[-1] if ends else None
+        while n is not None:
+            pairs.append(unique[n])
+            n = links[n]
+        pairs.reverse()
+
+        matched = dict(pairs)
+        for i, j in pairs:
+            for step in (-1, 1):
+                p, q = i + step, j + step
+                while 0 <= p < len(a) and 0 <= q < len(b) and \
+                        p not in matched and a[p][2] == b[q][2]:
+                    matched[p] = q
+                    p, q = p + step, q + step
+
+        segments = []
+        for i in sorted(matched):
+            j = matched[i]
+            st, ed = a[i][0], a[i][1]
+            if segments and segments[-1][0] + segments[-1][2] == st and \
+                    segments[-1][1] + segments[-1][2] == b[j][0]:
+                segments[-1] = (segments[-1][0], segments[-1][1],
+                                segments[-1][2] + ed - st)
+            elif not segments or segments[-1][1] + segments[-1][2] <= b[j][0]:
+                segments.append((st, b[j][0], ed - st))
+
+        versions = (self.version, mate.version, average)
+        self.alignCache[key] = (weakref.ref(mate), versions, segments)
+        return segments
+
+    def alignedCrossover(self, mate, name=None, rand=None, crosser=None,
+                         average=0x1000):
+        """ Create a crossover `Genome` from parents of different layouts.
+
+            Unlike `Genome.crossover`, the parents may be of different sizes,
+            or have their content at different offsets. They are first aligned
+            (see `Genome.align`): the regions they share are kept once, and for
+            each gap between them, either the part of `self` or that of `mate`
+            goes into the child. The child's size thus varies.
+
+            If the `crosser` function is not `None`, it is called for each gap
+            with the two candidate chunks (`self`'s first) and the index of the
+            gap, and returns the data to use, as for `Genome.crossover`.
+            Otherwise one of the two is picked at random, using `self`'s
+            random.
+
+            For `name` and `rand`, see `Genome.crossover`. As with
+            `Genome.copy`, the child inherits the checksums, pointer indexes
+            and compressed marks of `self`, and its partition (shifted by the
+            gaps whose size differs). The edit map (see `Genome.attribute`) is
+            only inherited if the child is of the same size.
+        """
+        self.pack()
+        segments = self.align(mate, average)
+        segments = segments + [(self.size, mate.size, 0)]
+
+        data = bytearray()
+        partition = self.partition
+        pa, pb = 0, 0
+
+        pr = grom.util.Progress("Crossing over", len(segments))
+        for k, (sa, sb, n) in enumerate(segments):
+            ga, gb = self.data[pa:sa], mate.data[pb:sb]
+            if callable(crosser):
+                r = crosser(ga, gb, k)
+                if isinstance(r, str):
+                    r = bytearray(r, 'ascii')
+            else:
+                r = grom.util.randit((ga, gb), self.rand)
+
+            r = bytes(r)
+            if len(r) != len(ga):
+                partition = partition.shift(len(data), len(data) + len(ga),
+                                            len(r))
+            data+= r
+            data+= self.data[sa:sa + n]
+            pa, pb = sa + n, sb + n
+
+            pr.update(k)
+        del pr
+
+        child = Genome(data, True, name or self.name + "x" + mate.name, rand,
+                       partition)
+        child.addChecksum(*[c.copy() for c in self.checksums])
+        child.indexPointers(*[p.copy() for p in self.pointers])
+        if self.attribution and child.size == self.size:
+            child.attribution = self.attribution.copy().attach(child)
+        if self.compressed:
+            child.compressed = self.compressed.copy()
+            child.watchers.append(child.touchBlocks)
+
+        return child
+    # END alignment
+
     # START data modification
     def __getitem__(self, k):
         """ Gets the data at `k`.
@@ -178,14 +887,76 @@ class Genome:
             r = self.partition[k]
             k = slice(r[0], r[-1] + 1)
 
-        self.data[k] = v
+        st, ed, step = k.indices(self.size)
+        if step == 1:
+            self.edit(st, max(st, ed), v)
+        else: # extended slice: edit the whole span it covers at once
+            r = range(st, ed, step)
+            if r:
+                lo, hi = min(r[0], r[-1]), max(r[0], r[-1]) + 1
+                span = self.data[lo:hi]
+                span[r[0] - lo::step] = v
+                self.edit(lo, hi, span)
+
+    def edit(self, st, ed, value):
+        """ Replaces the data from `st` to `ed` (excluded) with `value`.
+
+            If the size of `value` differs, the data is turned into a
+            `grom.Rope` to make further insertions and deletions cheap (it is
+            turned back into a `bytearray` by `Genome.save`).
+
+            Every modification of the data made by a `Genome` method goes
+            through here, so that the `watchers` get notified: each of them is
+            called after the change as `watcher(genome, st, old, new)`, with
+            `old` and `new` the replaced and replacing bytes. The `version`
+            counter is incremented by each edit.
+        """
+        ed = max(st, min(ed, self.size))
+        resize = len(value) != ed - st
+        if resize and not isinstance(self.data, grom.Rope):
+            self.data = grom.Rope(self.data)
+
+        self.version+= 1
+        if self.changes is not None:
+            if resize:
+                self.changes = None
+            else:
+                self.changes.append((st, ed))
+                if Genome.CHANGES < len(self.changes):
+                    self.changes = Genome.merged(self.changes)
+                    if Genome.CHANGES // 2 < len(self.changes): # scattered
+                        self.changes = None
+
+        if self.watchers:
+            old = self.data[st:ed]
+            self.data[st:ed] = value
+            if resize:
+                self.resized(st, ed, len(value))
+            for w in self.watchers:
+                w(self, st, old, value)
+        else:
+            self.data[st:ed] = value
+            if resize:
+                self.resized(st, ed, len(value))
+
+    def resized(self, st, ed, size):
+        """ Follows a change of size of the data.
+
+            Called by `Genome.edit` when `size` bytes replaced those from `st`
+            to `ed`: the partitions after the edit are shifted accordingly (on
+            a new `grom.Partition`, see `Partition.shift`). The previous one is
+            kept as `unshifted` for `Genome.record`.
+        """
+        self.size = len(self.data)
+        self.unshifted = self.partition
+        self.partition = self.partition.shift(st, ed, size)
 
     def __len__(self):
         """ Returns the size of the data (in bytes).
         """
         return self.size
 
-    def mutate(self, ratio, sigma, part=[]):
+    def mutate(self, ratio, sigma, part=[], heatmap=None):
         """ Mutate the `Genome` randomly.
 
             Affect `ratio` of the genome's data by adding a random integer from
@@ -199,32 +970,37 @@ class Genome:
             ranges (iterables) from which the destination will be chosen. If
             `bound` contains raw integers or raw string, they are interpreted
             as partition identifiers and thus replace by their partition's
-            range.
+            range. It may also hold `grom.Selection`s. The list is resolved
+            with `Partition.resolve` (sorted, overlaps merged, cached) and is
+            not modified. The partitions marked as compressed (see
+            `Genome.addCompressed`) are mutated in their expanded data.
+
+            If a `heatmap` is given (see `Generation.heatmap`), the mutated
+            bytes are drawn within `part` with its weights rather than
+            uniformly.
         """
         if isinstance(sigma, int):
             sigma = (-sigma, +sigma)
 
-        total = 0
+        blocks, part = self.splitBlocks(part)
+        for b in blocks:
+            b.mutate(ratio, sigma)
 
-        if not part:
-            part = [range(self.size)]
-            total = self.size
-        else:
-            for k in range(len(part)):
-                if isinstance(part[k], (int, str)):
-                    part[k] = self.partition[part[k]]
-                total+= len(part[k])
+        total = int(ratio * sum(len(r) for r in part))
 
-        total = int(ratio * total)
+        pieces, cumulated = heatmap.weights(part) if heatmap else ([], [])
+        if pieces:
+            drawn = self.rand.choices(pieces, cum_weights=cumulated, k=total)
+        else:
+            drawn = (r for r in part for c in range(int(ratio * len(r))))
 
         pr = grom.util.Progress("Mutation", total)
-        for r in part:
-            for c in range(int(ratio * len(r))):
-                k = grom.util.randit(r, self.rand)
-                new = self.data[k] + self.rand.randint(sigma[0], sigma[-1])
-                self.data[k] = new % 0x100
+        for r in drawn:
+            k = grom.util.randit(r, self.rand)
+            new = self.data[k] + self.rand.randint(sigma[0], sigma[-1])
+            self.edit(k, k + 1, bytes((new % 0x100,)))
 
-                pr.update()
+            pr.update()
         del pr
 
         return self
@@ -244,12 +1020,11 @@ class Genome:
             as partition identifiers and thus replace by their partition's
             range.
         """
+        blocks, part = self.splitBlocks(part)
+        for b in blocks:
+            b.geneswap(amount, maxSize)
         if not part:
-            part = [range(self.size)]
-        else:
-            for k in range(len(part)):
-                if isinstance(part[k], (int, str)):
-                    part[k] = self.partition[part[k]]
+            return self
 
         pr = grom.util.Progress("Gene swapping", amount)
         for k in range(amount):
@@ -258,12 +1033,102 @@ class Genome:
 
             s = min((len(r1) - 1, len(r2) - 1, maxSize))
 
-            p1 = grom.util.randit(r1[:-s] or [r1[0]])
-            p2 = grom.util.randit(r2[:-s] or [r2[0]])
+            p1 = grom.util.randit(r1[:-s] or [r1[0]], self.rand)
+            p2 = grom.util.randit(r2[:-s] or [r2[0]], self.rand)
 
             tmp = self.data[p1:p1 + s]
-            self.data[p1:p1 + s] = self.data[p2:p2 + s] 
-            self.data[p2:p2 + s] = tmp
+            self.edit(p1, p1 + s, self.data[p2:p2 + s])
+            self.edit(p2, p2 + s, tmp)
+
+            pr.update(k)
+        del pr
+
+        return self
+
+    def ranges(self, part):
+        """ Ranges designated by `part`, as of the current partition.
+
+            The partitions marked as compressed (see `Genome.addCompressed`)
+            are left out. Unlike the other operators, the size-changing ones
+            below look the partitions up again at each step, as their ranges
+            move.
+        """
+        ranges = self.partition.resolve(part) if part else [range(self.size)]
+        if self.compressed:
+            packed = grom.Selection.union([self.partition[n]
+                                           for n in self.compressed], [])
+            ranges = grom.Selection.subtract(list(ranges), packed)
+
+        return ranges
+
+    def insert(self, amount, maxSize, part=[], filler=None):
+        """ Inserts random chunks of data.
+
+            `amount` times, inserts from 1 to `maxSize` bytes at a random
+            position within `part` (before one of its bytes, so that the
+            partition containing it grows). The bytes are random, or `filler`
+            if given. The size of the data grows accordingly, and the
+            partitions after the insertion point are shifted.
+
+            For `part`, see `Genome.mutate`; the list is not modified.
+        """
+        pr = grom.util.Progress("Inserting", amount)
+        for k in range(amount):
+            r = grom.util.randit(self.ranges(part), self.rand)
+            if r: # not at `r.stop`, which would grow the next partition
+                p = grom.util.randit(r, self.rand)
+                s = self.rand.randint(1, maxSize)
+
+                if filler is None:
+                    data = bytes(self.rand.getrandbits(8) for n in range(s))
+                else:
+                    data = bytes((filler,)) * s
+                self.edit(p, p, data)
+
+            pr.update(k)
+        del pr
+
+        return self
+
+    def delete(self, amount, maxSize, part=[]):
+        """ Deletes random chunks of data.
+
+            `amount` times, removes from 1 to `maxSize` bytes (at most what is
+            left of the range) at a random position within `part`. The size of
+            the data shrinks, and the partitions are shifted accordingly.
+
+            For `part`, see `Genome.mutate`; the list is not modified.
+        """
+        pr = grom.util.Progress("Deleting", amount)
+        for k in range(amount):
+            r = grom.util.randit(self.ranges(part), self.rand)
+            if r:
+                s = self.rand.randint(1, min(maxSize, len(r)))
+                p = grom.util.randit(r[:len(r) - s + 1], self.rand)
+                self.edit(p, p + s, b'')
+
+            pr.update(k)
+        del pr
+
+        return self
+
+    def duplicate(self, amount, maxSize, part=[]):
+        """ Duplicates random chunks of data.
+
+            `amount` times, copies from 1 to `maxSize` bytes (at most what is
+            left of the range) at a random position within `part`, and inserts
+            the copy right after the original. The size of the data grows, and
+            the partitions are shifted accordingly.
+
+            For `part`, see `Genome.mutate`; the list is not modified.
+        """
+        pr = grom.util.Progress("Duplicating", amount)
+        for k in range(amount):
+            r = grom.util.randit(self.ranges(part), self.rand)
+            if r:
+                s = self.rand.randint(1, min(maxSize, len(r)))
+                p = grom.util.randit(r[:len(r) - s + 1], self.rand)
+                self.edit(p + s, p + s, self.data[p:p + s])
 
             pr.update(k)
         del pr
@@ -292,26 +1157,23 @@ class Genome:
             `groupBy` with unused bytes filled with `0x00` and only the needed
             bytes from the returned `bytearray` will by used.
         """
-        if not part:
-            part = [r for n, r in self.partition]
-        else:
-            for k in range(len(part)):
-                if isinstance(part[k], (int, str)):
-                    part[k] = self.partition[part[k]]
+        blocks, part = self.splitBlocks(part)
+        for b in blocks:
+            b.apply(do, [], groupBy)
 
         pr = grom.util.Progress("Applying", len(part))
         for r in part:
             for k in range(r[0], r[-1] + 1, groupBy):
                 if groupBy == 1:
-                    self.data[k] = do(self.data[k])
+                    self.edit(k, k + 1, bytes((do(self.data[k]),)))
                 else:
                     st, ed = k, k + groupBy
                     if ed < self.size + 1:
-                        self.data[st:ed + 1] = do(self.data[st:ed + 1])
+                        self.edit(st, ed, do(self.data[st:ed]))
                     else:
                         off = ed - self.size
                         data = self.data[st:self.size] + bytearray([0] * off)
-                        self.data[st:self.size] = do(data)[:groupBy - off]
+                        self.edit(st, self.size, do(data)[:groupBy - off])
         del pr
 
         return self
@@ -337,7 +1199,9 @@ class Genome:
             `int[]` `bytes` `str` (supposedly 'ascii' encoded) or `bytearray`.
             The new `Genome`'s data is initialized at `self.data`, therefore if
             `crosser` does not return an appropriated result, the partition will be
-            kept at this value.
+            kept at this value. The child starts as a copy of `self` (see
+            `Genome.copy`) and each chunk is written through `Genome.edit`, so
+            what follows the edits (like checksums) is updated incrementally.
 
             If not name is given, the name will be "`self.name`x`mate.name`".
 
@@ -353,14 +1217,11 @@ class Genome:
 
             Lastly, only `self`'s random is used.
         """
-        if not part:
-            part = [r for n, r in self.partition]
-        else:
-            for k in range(len(part)):
-                if isinstance(part[k], (int, str)):
-                    part[k] = self.partition[part[k]]
+        part = self.partition.resolve(part)
 
-        data = bytearray(self.data)
+        child = self.copy(name or self.name + "x" + mate.name)
+        child.rand = rand if isinstance(rand, grom.util.random.Random) else \
+                     grom.util.random.Random(rand)
 
         pr = grom.util.Progress("Crossing over", len(part))
         for k in range(len(part)):
@@ -377,22 +1238,17 @@ class Genome:
                 which = grom.util.randit((self.data, mate.data), self.rand)
                 r = which[st:ed + 1]
 
-            data[st:ed + 1] = r
+            child.edit(st, ed + 1, r)
 
             pr.update(k)
         del pr
 
-        return Genome(data, name or self.name + "x" + mate.name, rand, True)
+        return child
 
     def select(self, part, filler=None):
         """
         """
-        if not part:
-            part = [r for n, r in self.partition]
-        else:
-            for k in range(len(part)):
-                if isinstance(part[k], (int, str)):
-                    part[k] = self.partition[part[k]]
+        part = self.partition.resolve(part)
 
         data = bytearray([filler])*self.size if filler != None else bytearray()
 
@@ -0,0 +1,258 @@
+import grom
+import re
+
+class Image:
+    """ An uncompressed raster image stored in the data of a `Genome`.
+
+        The pixels are `height` rows of `width` pixels of `channels` bytes,
+        starting at `offset`, each row taking `stride` bytes (padding
+        included). Rows are stored top first, unless `topDown` is `False` (as
+        most BMP files are). Rows, columns and channels are numbered as seen
+        on the image (row 0 at the top), whatever the layout in the data.
+
+        The adapters of this class read the layout from the header of common
+        formats (see `Image.bmp` and `Image.pnm`); other layouts can be
+        described by hand.
+
+        A selection is made of `rows` (a `range` or a list of rows), `columns`
+        (a `range`) and a `channel` (an `int`), each defaulting to all of them.
+        It is turned into a handful of extended slices of the data (one per
+        row, or a single one when the rows are contiguous), so that the
+        operations below are done by `bytearray` slicing at C speed, and go
+        through a single `Genome.edit`.
+    """
+    def __init__(self, genome, width, height, channels=1, offset=0,
+                 stride=None, topDown=True):
+        """ Describes a raster layout, see the class documentation.
+        """
+        self.genome = genome
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.offset = offset
+        self.stride = stride or width * channels
+        self.topDown = topDown
+
+        end = offset + self.stride * height
+        if genome.size < end:
+            raise ValueError("the pixels go past the end of the data "
+                             "(0x{:X} < 0x{:X})".format(genome.size, end))
+
+    def __str__(self):
+        return "Image {}x{}x{} (at 0x{:X})".format(self.width, self.height,
+                                                   self.channels, self.offset)
+
+    @staticmethod
+    def bmp(genome):
+        """ Reads the layout of a BMP file (8, 16, 24 or 32 bits, no RLE).
+        """
+        data = genome.data
+        if bytes(data[0:2]) != b'BM':
+            raise ValueError("not a BMP file")
+
+        def read(at, size, signed=False):
+            return int.from_bytes(data[at:at + size], 'little', signed=signed)
+
+        offset = read(10, 4)
+        if read(14, 4) == 12: # BITMAPCOREHEADER
+            width, height, bpp, compression = read(18, 2), read(20, 2), \
+                                              read(24, 2), 0
+        else:
+            width, height = read(18, 4, True), read(22, 4, True)
+            bpp, compression = read(28, 2), read(30, 4)
+
+        if bpp % 8 or compression not in (0, 3):
+            raise ValueError("unsupported BMP ({} bits, compression {})"
+                             .format(bpp, compression))
+
+        return Image(genome, width, abs(height), bpp // 8, offset,
+                     (bpp * width + 31) // 32 * 4, height < 0)
+
+    @staticmethod
+    def pnm(genome):
+        """ Reads the layout of a binary PGM (P5) or PPM (P6) file.
+        """
+        space = rb'(?:\s+|#[^\n]*\n)+' # comments included
+        m = re.match(rb'P([56])' + space + rb'(\d+)' + space + rb'(\d+)' +
+                     space + rb'(\d+)\s', bytes(genome.data[:512]))
+        if not m:
+            raise ValueError("not a binary PGM or PPM file")
+        if 0xFF < int(m.group(4)):
+            raise ValueError("unsupported PNM (16 bits samples)")
+
+        return Image(genome, int(m.group(2)), int(m.group(3)),
+                     3 if m.group(1) == b'6' else 1, m.end())
+
+    def copy(self, genome):
+        """ Returns the same layout, for `genome` (e.g. a copy of the data).
+        """
+        return Image(genome, self.width, self.height, self.channels,
+                     self.offset, self.stride, self.topDown)
+
+    def row(self, y):
+        """ Returns the offset in the data of the row `y` (0 at the top).
+        """
+        if not self.topDown:
+            y = self.height - 1 - y
+        return self.offset + y * self.stride
+
+    def partition(self, names="row {}"):
+        """ Returns the matching `grom.Partition`.
+
+            It has a `"header"` (up to the pixels), one partition per row
+            (named from `names` and the row number, padding included) and a
+            `"tail"` if anything follows the pixels, in the order of the data.
+        """
+        rows = sorted((self.row(y), y) for y in range(self.height))
+        parts = [("header", range(0, self.offset))]
+        parts+= [(names.format(y), range(st, st + self.stride))
+                 for st, y in rows]
+
+        end = self.offset + self.stride * self.height
+        if end < self.genome.size:
+            parts.append(("tail", range(end, self.genome.size)))
+
+        return grom.Partition(self.genome.size, parts)
+
+    def view(self):
+        """ Returns a 2D `memoryview` of the rows, as stored (zero-copy).
+
+            Its shape is `(height, stride)`, so `view()[k, x]` is the byte `x`
+            of the `k`-th row in the data. Writing through it bypasses
+            `Genome.edit` (and thus the watchers): prefer the operations of
+            this class. The data is materialized first (see
+            `Genome.materialize`).
+        """
+        size = self.stride * self.height
+        data = memoryview(self.genome.materialize().data)
+        return data[self.offset:self.offset + size].cast('B', (self.height,
+                                                                self.stride))
+
+    def pixels(self):
+        """ Returns a 3D `memoryview` of the pixels, as stored (zero-copy).
+
+            Its shape is `(height, width, channels)`. Only possible if the rows
+            are not padded, see `Image.view` otherwise.
+        """
+        if self.stride != self.width * self.channels:
+            raise ValueError("padded rows, use `Image.view`")
+
+        return self.view().cast('B').cast('B', (self.height, self.width,
+                                                self.channels))
+
+    def slices(self, rows=None, columns=None, channel=None):
+        """ Returns the list of the `slice`s of the data covering a selection,
+            in the order of the data.
+        """
+        rows = range(self.height) if rows is None else rows
+        columns = range(self.width) if columns is None else columns
+        if not rows or not columns:
+            return []
+
+        c = self.channels
+        if channel is None:
+            a, b, step = columns.start * c, columns.stop * c, 1
+        else:
+            a, b, step = columns.start * c + channel, columns.stop * c, c
+
+        slices = []
+        for st in sorted(self.row(y) for y in rows):
+            s = slice(st + a, st + b, step)
+            if slices: # merge with the previous slice if it runs into it
+                last = slices[-1]
+                end = last.start + (last.stop - 1 - last.start) // step * step
+                if end + step == s.start:
+                    slices[-1] = slice(last.start, s.stop, step)
+                    continue
+            slices.append(s)
+
+        return slices
+
+    def get(self, rows=None, columns=None, channel=None):
+        """ Returns the bytes of a selection, in the order of the data.
+        """
+        data = self.genome.data
+        return bytearray().join(data[s] for s in self.slices(rows, columns,
+                                                              channel))
+
+    def set(self, values, rows=None, columns=None, channel=None):
+        """ Writes `values` (as returned by `Image.get`) into a selection.
+
+            The area covering the selection is written with a single
+            `Genome.edit`.
+        """
+        slices = self.slices(rows, columns, channel)
+        if not slices:
+            return self
+
+        lo, hi = slices[0].start, max(s.stop for s in slices)
+        area = self.genome.data[lo:hi]
+
+        k = 0
+        for s in slices:
+            n = len(range(s.start, s.stop, s.step))
+            area[s.start - lo:s.stop - lo:s.step] = values[k:k + n]
+            k+= n
+
+        self.genome.edit(lo, hi, area)
+        return self
+
+    def transform(self, do, rows=None, columns=None, channel=None):
+        """ Replaces each byte `v` of a selection with `do(v)`.
+
+            `do` is only called on the 256 possible values, the selection is
+            then translated at C speed (see `bytes.translate`).
+        """
+        table = bytes(do(v) & 0xFF for v in range(256))
+        values = self.get(rows, columns, channel)
+
+        return self.set(values.translate(table), rows, columns, channel)
+
+    def mutate(self, ratio, sigma, rows=None, columns=None, channel=None):
+        """ Mutates a selection, as `Genome.mutate` does.
+
+            The selection is read, mutated and written back at once.
+        """
+        if isinstance(sigma, int):
+            sigma = (-sigma, +sigma)
+
+        rand = self.genome.rand
+        values = self.get(rows, columns, channel)
+        for c in range(int(ratio * len(values))):
+            k = rand.randrange(len(values))
+            values[k] = (values[k] + rand.randint(sigma[0], sigma[-1])) % 0x100
+
+        return self.set(values, rows, columns, channel)
+
+    def region(self, rand=None):
+        """ Draws a random rectangle, as a `(rows, columns)` tuple of `range`s.
+        """
+        rand = rand or self.genome.rand
+        y = sorted(rand.randrange(self.height + 1) for k in range(2))
+        x = sorted(rand.randrange(self.width + 1) for k in range(2))
+
+        return range(*y), range(*x)
+
+    def crossover(self, mate, name=None, rows=None, columns=None,
+                  channel=None):
+        """ Creates a `Genome` from this one with a selection taken from `mate`.
+
+            `mate` is an `Image` of the same size, or a `Genome` laid out the
+            same way. If no selection is given at all, a random rectangle is
+            taken (see `Image.region`). The child starts as a copy of this
+            `Image`'s `Genome` (see `Genome.copy`). Returns the child's
+            `Image`.
+        """
+        if isinstance(mate, grom.Genome):
+            mate = self.copy(mate)
+        if (mate.width, mate.height, mate.channels) != \
+                (self.width, self.height, self.channels):
+            raise ValueError("{} and {} differ".format(self, mate))
+
+        if rows is None and columns is None and channel is None:
+            rows, columns = self.region()
+
+        child = self.copy(self.genome.copy(name or self.genome.name + "x" +
+                                           mate.genome.name))
+        return child.set(mate.get(rows, columns, channel),
+                         rows, columns, channel)
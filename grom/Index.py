@@ -0,0 +1,217 @@
+import grom
+import bisect
+import re
+
+class Index:
+    """ A search index over the bytes of a `Genome`.
+
+        The index keeps, for each `n` bytes long gram it was asked about, the
+        sorted list of its positions in the data. A pattern is searched by
+        looking its rarest gram up, then checking the few candidates: the
+        grams are found once (with `bytes.find`, at C speed), and the
+        next queries sharing them only cost a lookup.
+
+        Grams more common than `Index.LIMIT` (e.g. in padding) are not listed:
+        their count is estimated at C speed first (see `bytes.count`), and a
+        pattern made only of such grams is searched in the whole data instead,
+        which is as fast as it gets for them.
+
+        For relative searches (text in an unknown encoding), the index keeps
+        the differences between consecutive bytes of the data, computed once
+        with big integer arithmetic (see `Index.differences`).
+
+        The index registers itself as one of the `Genome`'s watchers: the
+        grams an edit overlaps are found again in the edited area only. If the
+        size of the data changes, everything is dropped (and found again
+        lazily). See `Genome.index`.
+    """
+    LIMIT = 0x1000
+
+    def __init__(self, genome, n=3):
+        """ Indexes `genome`, see `Genome.index`.
+        """
+        self.n = n
+        self.grams = dict()
+        self.dense = set()
+        self.deltas = None
+
+        self.genome = genome
+        genome.watchers.append(self.touch)
+
+    def data(self):
+        """ The data, as something `re` can search.
+        """
+        data = self.genome.data
+        return data if isinstance(data, bytearray) else bytes(data)
+
+    @staticmethod
+    def scan(data, pattern, offset=0):
+        """ Returns the positions of `pattern` in `data` (overlapping ones
+            included), plus `offset`.
+
+            Uses `bytes.find`, which skips through the data at C speed.
+        """
+        found, k = [], data.find(pattern)
+        while 0 <= k:
+            found.append(offset + k)
+            k = data.find(pattern, k + 1)
+
+        return found
+
+    def gram(self, g):
+        """ Returns the sorted list of the positions of the gram `g`, or
+            `None` if it is too common to be listed (see `Index.LIMIT`).
+        """
+        if g in self.dense:
+            return None
+        if g not in self.grams:
+            data = self.data()
+            if Index.LIMIT < data.count(g):
+                self.dense.add(g)
+                return None
+            self.grams[g] = Index.scan(data, g)
+
+        return self.grams[g]
+
+    def touch(self, genome, st, old, new):
+        """ Watcher updating the grams and differences covered by an edit.
+        """
+        if len(old) != len(new):
+            self.grams = dict()
+            self.dense = set()
+            self.deltas = None
+            return
+
+        lo, hi = max(0, st - self.n + 1), st + len(new)
+        window = bytes(genome.data[lo:hi + self.n - 1])
+        for g, positions in self.grams.items():
+            a = bisect.bisect_left(positions, lo)
+            b = bisect.bisect_left(positions, hi)
+            positions[a:b] = Index.scan(window, g, lo)
+
+        if self.deltas is not None:
+            lo = max(0, st - 1)
+            hi = min(genome.size - 1, st + len(new))
+            self.deltas[lo:hi] = Index.differences(genome.data[lo:hi + 1])
+
+    @staticmethod
+    def differences(data):
+        """ Returns the differences between consecutive bytes of `data`, as a
+            `bytearray` (modulo 0x100) one byte shorter than `data`.
+
+            Both shifted copies of the data are spread into 16 bits lanes, the
+            lower one borrowing from a 0x100 in each lane: a single big integer
+            subtraction then computes every difference at C speed.
+        """
+        n = len(data) - 1
+        if n < 1:
+            return bytearray()
+
+        a, b = bytearray(2 * n), bytearray(2 * n)
+        a[0::2], a[1::2] = data[1:], b'\x01' * n
+        b[0::2] = data[:-1]
+
+        x = int.from_bytes(a, 'little') - int.from_bytes(b, 'little')
+        return bytearray(x.to_bytes(2 * n, 'little')[0::2])
+
+    def find(self, pattern):
+        """ Returns the sorted positions of the `bytes` `pattern` in the data.
+
+            Only the grams of `pattern` already known and a few others are
+            looked up, the rarest giving the candidates. Patterns shorter than
+            the grams, or made of too common grams only, are searched in the
+            whole data.
+        """
+        pattern = bytes(pattern)
+        if len(pattern) < self.n:
+            if not pattern:
+                return []
+            return Index.scan(self.data(), pattern)
+
+        offsets = range(len(pattern) - self.n + 1)
+        tried = [j for j in offsets if pattern[j:j + self.n] in self.grams]
+        tried+= offsets[::max(1, len(offsets) // 3)][:4] # a few new ones
+        tried = [j for j in tried if self.gram(pattern[j:j + self.n])
+                                     is not None]
+        if not tried:
+            return Index.scan(self.data(), pattern)
+
+        j = min(tried, key=lambda j: len(self.gram(pattern[j:j + self.n])))
+        data, size = self.genome.data, len(pattern)
+
+        return [p - j for p in self.gram(pattern[j:j + self.n])
+                if j <= p and data[p - j:p - j + size] == pattern]
+
+    def match(self, pattern, wildcard=None):
+        """ Returns the sorted positions of a `pattern` with wildcards.
+
+            `pattern` is a list of byte values, `None` matching any byte. If
+            `wildcard` is given, `pattern` may be `bytes` (or a `str`) where
+            the `wildcard` byte (or character) matches any byte:
+            ```python
+            g.index().match(b'\\x01??\\x02', b'?')
+            ```
+            The longest fixed part is looked up with `Index.find`, the
+            candidates are checked with a regular expression.
+        """
+        if isinstance(pattern, str):
+            pattern = pattern.encode('ascii')
+            wildcard = ord(wildcard) if isinstance(wildcard, str) else wildcard
+        if isinstance(wildcard, bytes):
+            wildcard = wildcard[0]
+        pattern = [None if c == wildcard else c for c in pattern]
+
+        regex = re.compile(b''.join(b'.' if c is None else
+                                    re.escape(bytes((c,))) for c in pattern),
+                           re.DOTALL)
+
+        parts, st = [], 0
+        for k in range(len(pattern) + 1):
+            if k == len(pattern) or pattern[k] is None:
+                if st < k:
+                    parts.append((k - st, st))
+                st = k + 1
+        if not parts or max(parts)[0] < self.n:
+            lookahead = re.compile(b'(?=' + regex.pattern + b')', re.DOTALL)
+            return [m.start() for m in lookahead.finditer(self.data())]
+
+        size, st = max(parts)
+        data = self.data()
+        return [p - st for p in self.find(bytes(pattern[st:st + size]))
+                if st <= p and regex.match(data, p - st)]
+
+    def relative(self, text):
+        """ Searches `text` whatever the encoding, as long as its characters
+            are mapped in the same order (e.g. `"A"` to `"Z"` consecutively).
+
+            `text` is a `str` or `bytes`. Returns a sorted list of `(position,
+            offset)`: the data at `position` is `text` with `offset` added to
+            every byte (modulo 0x100), which gives the encoding.
+        """
+        if isinstance(text, str):
+            text = text.encode('ascii')
+        if len(text) < 2:
+            raise ValueError("relative searches need 2 characters or more")
+
+        if self.deltas is None:
+            self.deltas = Index.differences(self.data())
+
+        data = self.genome.data
+        return [(p, (data[p] - text[0]) & 0xFF)
+                for p in Index.scan(self.deltas, Index.differences(text))]
+
+    @staticmethod
+    def entries(hits, size, name="0x{:X}"):
+        """ Turns hits into `Partition` entries.
+
+            `hits` are positions (or `(position, offset)` tuples, as returned
+            by `Index.relative`), each covering `size` bytes. `name` is
+            formatted with the position and the number of the hit. Returns a
+            list of `(str, range)`, as expected by `grom.Partition`:
+            ```python
+            hits = g.index().find(b'POKEDEX')
+            P = Partition(g.size, Index.entries(hits, 7, "Pokedex {1}"))
+            ```
+        """
+        return [(name.format(p, k), range(p, p + size)) for k, p in
+                enumerate(h[0] if isinstance(h, tuple) else h for h in hits)]
@@ -24,6 +24,9 @@ class Partition:
             name as an identifier, but rather the number.
         """
         self.size = size
+        self.selections = dict()
+        self.resolved = dict()
+        self.compiled = dict()
 
         if not partition:
             partition = [("default", range(self.size))]
@@ -98,6 +101,7 @@ class Partition:
 
         self.partition = []
         self.pmap = dict()
+        self.invalidate()
 
         lines = file.readlines()
         lineCurr, lineNext = "", ""
@@ -118,6 +122,38 @@ class Partition:
 
         return self
 
+    @staticmethod
+    def parseAddress(lineCurr, lineNext):
+        """ Parser for maps of lines such as `"$1A2B-1A3F Some name"`.
+
+            Addresses are in hexadecimal, the `$` is optional. If the end
+            address is missing (`"$1A2B Some name"` or `"$1A2B- Some name"`),
+            the range goes up to the start of the next line. To use with
+            `Partition.load`.
+        """
+        address, name = lineCurr.split(' ', 1)
+        st, ed = (address.replace('$', '').split('-') + [''])[:2]
+
+        if not ed:
+            after = lineNext.split(' ', 1)[0].replace('$', '').split('-')[0]
+            return (name.strip(), range(int(st, 16), int(after, 16)))
+
+        return (name.strip(), range(int(st, 16), int(ed, 16) + 1))
+
+    @staticmethod
+    def parseRange(lineCurr, lineNext=None):
+        """ Parser for maps of lines such as `"1A2B to 1A3F (21b) = Some name"`.
+
+            Addresses are in hexadecimal, both ends included, anything between
+            the end address and the `=` is ignored. To use with
+            `Partition.load`.
+        """
+        addresses, name = lineCurr.split(" = ", 1)
+        start, end = addresses.split(" to ", 1)
+        end = end.split(" ", 1)[0]
+
+        return (name.strip(), range(int(start, 16), int(end, 16) + 1))
+
     def __getitem__(self, k):
         """ Returns the partition `k`'s `range`.
 
@@ -135,6 +171,7 @@ class Partition:
         if isinstance(k, str):
             k = self.idof(k)
         self.partition[k] = (self.partition[k][0], v)
+        self.invalidate()
 
     def __len__(self):
         """ Returns the number of partition for the data.
@@ -149,6 +186,86 @@ class Partition:
     def idof(self, n):
         return self.pmap[n]
 
+    def select(self, *parts):
+        """ Returns a `grom.Selection` of the partitions `parts`.
+
+            Each of `parts` is anything `Partition.resolve` accepts in a list.
+            With no `parts`, the selection is empty (use `~P.select()` for
+            all of the data).
+        """
+        return grom.Selection(self, ('parts', parts))
+
+    def define(self, name, selection):
+        """ Names a `grom.Selection`, so that `name` can be used in `part`s.
+
+            A partition of the same name takes precedence. Named selections
+            are carried over by `Partition.shift`.
+        """
+        self.selections[name] = selection
+        self.invalidate()
+
+        return self
+
+    def resolve(self, part=[]):
+        """ Returns the `range`s designated by `part`.
+
+            `part` is a list of partition identifiers (`str` names or `int`
+            IDs), names of selections (see `Partition.define`), `Selection`s
+            and `range`s. If it is empty, every partition is used.
+
+            The result is a `tuple` of non-empty `range`s, sorted by start and
+            with the overlapping ones merged, so that no byte appears twice
+            (adjacent ranges are kept apart). It is cached by the content of
+            `part`: resolving the same list again only costs a lookup. The
+            cache is dropped whenever the partition is modified.
+        """
+        try:
+            key = tuple(part)
+            ranges = self.resolved.get(key)
+        except TypeError: # unhashable items, no caching
+            key, ranges = None, None
+        if ranges is not None:
+            return ranges
+
+        found = []
+        for p in part or range(len(self)):
+            if isinstance(p, grom.Selection):
+                found+= p.ranges(self)
+            elif isinstance(p, str) and p not in self.pmap:
+                found+= self.selections[p].ranges(self)
+            elif isinstance(p, (int, str)):
+                found.append(self[p])
+            else:
+                found.append(range(p[0], p[-1] + 1) if p else p)
+
+        merged = []
+        for r in sorted((r for r in found if r), key=lambda r: r.start):
+            if merged and r.start < merged[-1].stop:
+                last = merged.pop()
+                r = range(last.start, max(last.stop, r.stop))
+            merged.append(r)
+        ranges = tuple(merged)
+
+        if key is not None:
+            self.resolved[key] = ranges
+        return ranges
+
+    def __getstate__(self):
+        """ Pickles the partition without the caches of `Partition.resolve`.
+        """
+        state = self.__dict__.copy()
+        state['resolved'], state['compiled'] = dict(), dict()
+        return state
+
+    def invalidate(self):
+        """ Drops the cached results of `Partition.resolve` and selections.
+
+            Called by the methods modifying the partition; call it if you
+            modify `Partition.partition` directly.
+        """
+        self.resolved.clear()
+        self.compiled.clear()
+
     def check(self):
         """ Check the integrity of the partition. Quite slow.
 
@@ -225,6 +342,35 @@ class Partition:
         # # return self
         # return Partition(self.partition + mate.part, self.size)
 
+    def shift(self, st, ed, size):
+        """ Returns a copy of the partition following a change of size.
+
+            The data from `st` to `ed` (excluded) was replaced with `size`
+            bytes: the bounds after `ed` move by the difference, the bounds
+            within the replaced area are clamped into its new extent. Bytes
+            inserted at a bound go to the partition starting there.
+
+            A new `Partition` is returned because a partition system is often
+            shared (e.g. by all the `Genome`s of a `Generation`).
+        """
+        def move(p):
+            if p <= st:
+                return p
+            if ed <= p:
+                return p + size - (ed - st)
+            return min(p, st + size)
+
+        other = Partition.__new__(Partition)
+        other.size = self.size + size - (ed - st)
+        other.pmap = self.pmap.copy()
+        other.selections = self.selections
+        other.resolved = dict()
+        other.compiled = dict()
+        other.partition = [(n, range(move(r.start), move(r.stop)))
+                           for n, r in self.partition]
+
+        return other
+
     def resize(self, k, before, after): # TODO: check
         """ Resizes a partition.
 
@@ -253,5 +399,6 @@ class Partition:
                                      self.partition[k + 1][1][after:])
 
         self.partition[k] = (self.partition[k][0], range(lower, upper))
+        self.invalidate()
 
         return self
@@ -0,0 +1,203 @@
+import grom
+import functools
+import heapq
+import itertools
+import queue
+import threading
+
+class Pipeline:
+    """ A lazy stream of `(name, value)` items, usually the `Genome`s of a
+        `Generation` (see `Generation.stream`).
+
+        Each stage returns a new `Pipeline` and does nothing until iterated,
+        one item at a time: only the items in flight are held in memory,
+        however large the population. Stages stop pulling items as soon as
+        the end of the pipeline stops (e.g. `Pipeline.take`), so the rest of
+        the population is never even looked at:
+        ```python
+        best = G.stream(lambda g: g.size < 0x8000) \\
+                .map(lambda g: g.copy().mutate(.001, 1)) \\
+                .score(evaluate, batchSize=8, workers=4) \\
+                .top(3)
+        ```
+
+        Stages taking `workers` run on a pool (see `grom.util.parallel`): at
+        most twice `workers` items are then in flight, in order. Threads are
+        used by default, as stages are often lambdas (processes need the
+        functions and the values to be picklable, and return copies). See
+        `Pipeline.buffer` to run the stages before it in a thread of their
+        own.
+    """
+    END = object()
+
+    def __init__(self, source):
+        """ Wraps an iterable of `(name, value)` items.
+        """
+        self.source = source
+
+    def __iter__(self):
+        return iter(self.source)
+
+    @staticmethod
+    def call(do, name, value):
+        """ Returns `(name, do(value))`, the unit of work of the stages.
+        """
+        return name, do(value)
+
+    @staticmethod
+    def check(only, name, value):
+        """ Returns `(name, value, only(value))`, for `Pipeline.filter`.
+        """
+        return name, value, only(value)
+
+    @staticmethod
+    def pair(evaluate, values):
+        """ Returns the list of `(value, fitness)`, for `Pipeline.score`.
+        """
+        return list(zip(values, evaluate(values)))
+
+    def run(self, do, workers, threads):
+        """ Yields `do(name, value)` for every item, on a pool if `workers` is
+            not 1.
+        """
+        if workers == 1:
+            return (do(n, v) for n, v in self)
+        return grom.util.parallel(do, iter(self), workers, threads)
+
+    def map(self, do, workers=1, threads=True):
+        """ Replaces each value with `do(value)`.
+
+            Operators of `Genome` return the `Genome` itself, so they can be
+            chained straight away (copy it first to leave the population as
+            is).
+        """
+        return Pipeline(self.run(functools.partial(Pipeline.call, do),
+                                 workers, threads))
+
+    def filter(self, only, workers=1, threads=True):
+        """ Keeps the items whose value passes `only(value)`.
+        """
+        checked = self.run(functools.partial(Pipeline.check, only),
+                           workers, threads)
+        return Pipeline((n, v) for n, v, keep in checked if keep)
+
+    def batch(self, do, batchSize=8, workers=1, threads=True):
+        """ Replaces the values by batches: `do` is given a list of (at most)
+            `batchSize` values and returns the list of their replacements.
+        """
+        def batches():
+            items = iter(self)
+            while True:
+                chunk = list(itertools.islice(items, batchSize))
+                if not chunk:
+                    return
+                yield [n for n, v in chunk], [v for n, v in chunk]
+
+        def unbatch():
+            for names, values in Pipeline(batches()).run(
+                    functools.partial(Pipeline.call, do), workers, threads):
+                yield from zip(names, values)
+
+        return Pipeline(unbatch())
+
+    def score(self, evaluate, batchSize=8, workers=1, threads=True):
+        """ Replaces each value with `(value, fitness)`.
+
+            `evaluate` is as for `grom.Evolution`: given a list of values, it
+            returns the list of their fitness. It is called by batches of
+            `batchSize`.
+        """
+        return self.batch(functools.partial(Pipeline.pair, evaluate),
+                          batchSize, workers, threads)
+
+    def validate(self, validators, repair=False, batchSize=64):
+        """ Keeps the items whose value passes every one of the `validators`.
+
+            The values (`Genome`s) are screened by batches of `batchSize`, see
+            `grom.Validator.screen`; if `repair` is set, they are repaired
+            where possible instead of dropped. Put it before the expensive
+            stages (e.g. `Pipeline.score`).
+        """
+        def screened():
+            items = iter(self)
+            while True:
+                chunk = list(itertools.islice(items, batchSize))
+                if not chunk:
+                    return
+                kept, rejected = grom.Validator.screen(
+                        validators, [v for n, v in chunk], repair)
+                kept = set(map(id, kept))
+                yield from ((n, v) for n, v in chunk if id(v) in kept)
+
+        return Pipeline(screened())
+
+    def take(self, amount):
+        """ Keeps the first `amount` items, then stops.
+        """
+        return Pipeline(itertools.islice(self, amount))
+
+    def buffer(self, size=16):
+        """ Runs the stages up to here in a thread of their own, up to `size`
+            items ahead of the rest.
+
+            The following stages then overlap with the previous ones instead of
+            waiting on them, with a bounded amount of items in between. The
+            thread stops with the pipeline (exceptions are raised on the
+            consumer's side).
+        """
+        return Pipeline(self.buffered(size))
+
+    def buffered(self, size):
+        """ Generator behind `Pipeline.buffer`.
+        """
+        items = queue.Queue(size)
+        stop = threading.Event()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    items.put(item, timeout=.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def produce():
+            try:
+                for item in self:
+                    if not put(item):
+                        return
+                put((Pipeline.END, None))
+            except Exception as e:
+                put((Pipeline.END, e))
+
+        threading.Thread(target=produce, daemon=True).start()
+        try:
+            while True:
+                item = items.get()
+                if item[0] is Pipeline.END:
+                    if item[1] is not None:
+                        raise item[1]
+                    return
+                yield item
+        finally:
+            stop.set()
+
+    def top(self, amount, key=None):
+        """ Returns the `amount` items of greatest `key(value)`, greatest first.
+
+            `key` defaults to the fitness added by `Pipeline.score`. Only
+            `amount` items are kept at a time.
+        """
+        key = key or (lambda v: v[1])
+        return heapq.nlargest(amount, self, key=lambda item: key(item[1]))
+
+    def collect(self):
+        """ Returns the items as a `list`.
+        """
+        return list(self)
+
+    def count(self):
+        """ Returns the number of items, running through the pipeline.
+        """
+        return sum(1 for item in self)
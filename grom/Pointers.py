@@ -0,0 +1,241 @@
+import grom
+import bisect
+import re
+
+class Pointers:
+    """ An index of the words of the data that look like pointers into `part`.
+
+        A pointer is a `width` bytes word, found at a multiple of `align`,
+        whose value `decode`s to an offset within the ranges of `part` (as
+        resolved by `Partition.resolve`). Ready-made indexes for common ROM
+        formats are built by the static methods of this class.
+
+        The data is not decoded word by word: the most significant byte of
+        the address (at `key` within the word) can only take a few values for
+        a given `part`, so the candidates are found with a regular expression,
+        at C speed, and only those are decoded.
+
+        Once attached to a `Genome` (see `Genome.indexPointers`), the index
+        follows the edits: only the words an edit overlaps are scanned again.
+        If the size of the data changes, everything moved and the data is
+        scanned again, against the shifted partition. See `Genome.relocate`
+        to move data and rewrite the pointers into it.
+    """
+    def __init__(self, name, part, width, align, key, span, decode, encode):
+        """ Creates a pointer index, see the class documentation.
+
+            `decode(word, at)` returns the offset the `word` (an `int`) found
+            at `at` points to, or `None`. `encode(offset, at)` returns the
+            `bytes` of a word at `at` pointing to `offset`, or `None` if it
+            can not. The byte at `key` of the encoded words is the same for
+            `span` consecutive offsets (aligned on `span`).
+        """
+        self.name = name
+        self.part = list(part)
+        self.width = width
+        self.align = align
+        self.key = key
+        self.span = span
+        self.decode = decode
+        self.encode = encode
+
+        self.genome = None
+        self.pointers = dict()
+        self.compiled = None
+
+    def __str__(self):
+        return "Pointers {} ({} found)".format(self.name, len(self.pointers))
+
+    def __len__(self):
+        return len(self.pointers)
+
+    def __iter__(self):
+        """ Iterates over the `(at, offset)` of the pointers, by position.
+        """
+        return iter(sorted(self.pointers.items()))
+
+    @staticmethod
+    def gb(part):
+        """ Game Boy 16 bits pointers (little-endian), into `part`.
+
+            A pointer to 0x0000-0x3FFF is into bank 0, one to 0x4000-0x7FFF
+            is into the bank the pointer itself is in: pointers across banks
+            can not be told apart from the data (see `Pointers.gbFar`).
+        """
+        def decode(v, at):
+            if v < 0x4000:
+                return v
+            if v < 0x8000 and 0x4000 <= at:
+                return at // 0x4000 * 0x4000 + v - 0x4000
+            return None
+
+        def encode(t, at):
+            if t < 0x4000:
+                return t.to_bytes(2, 'little')
+            if 0x4000 <= at and t // 0x4000 == at // 0x4000:
+                return (0x4000 + t % 0x4000).to_bytes(2, 'little')
+            return None
+
+        return Pointers("GB", part, 2, 1, 1, 0x100, decode, encode)
+
+    @staticmethod
+    def gbFar(part):
+        """ Game Boy 24 bits bank:address pointers, into `part`.
+
+            The bank byte is followed by the address (little-endian), which
+            is in 0x4000-0x7FFF, or in 0x0000-0x3FFF for bank 0.
+        """
+        def decode(v, at):
+            bank, address = v & 0xFF, v >> 8
+            if not bank and address < 0x4000:
+                return address
+            if bank and 0x4000 <= address < 0x8000:
+                return bank * 0x4000 + address - 0x4000
+            return None
+
+        def encode(t, at):
+            bank = t // 0x4000
+            if 0xFF < bank:
+                return None
+            address = t % 0x4000 + (0x4000 if bank else 0)
+            return bytes((bank,)) + address.to_bytes(2, 'little')
+
+        return Pointers("GB far", part, 3, 1, 2, 0x100, decode, encode)
+
+    @staticmethod
+    def gba(part):
+        """ Game Boy Advance 32 bits pointers (0x08000000 onward, aligned),
+            into `part`.
+        """
+        def decode(v, at):
+            return v - 0x8000000 if 0x8000000 <= v < 0xA000000 else None
+
+        def encode(t, at):
+            if 0x2000000 <= t:
+                return None
+            return (0x8000000 + t).to_bytes(4, 'little')
+
+        return Pointers("GBA", part, 4, 4, 3, 0x1000000, decode, encode)
+
+    def attach(self, genome, rescan=True):
+        """ Binds the index to `genome`.
+
+            The data is scanned once, unless `rescan` is `False` (the index is
+            then assumed to already match the data).
+        """
+        self.genome = genome
+        if rescan:
+            self.rescan()
+        genome.watchers.append(self.touch)
+
+        return self
+
+    def copy(self):
+        """ Returns an unbound copy of this index, its pointers included.
+        """
+        other = Pointers(self.name, self.part, self.width, self.align,
+                         self.key, self.span, self.decode, self.encode)
+        other.pointers = self.pointers.copy()
+
+        return other
+
+    def targets(self):
+        """ Ranges the pointers may point into, as of the current partition.
+
+            Returns a tuple `(ranges, starts, pattern)`: the `range`s, their
+            starts and the regular expression matching the key bytes. It is
+            cached for as long as the partition gives the same ranges.
+        """
+        ranges = self.genome.partition.resolve(self.part)
+        if self.compiled and self.compiled[0] is ranges:
+            return self.compiled
+
+        keys = set()
+        for r in ranges:
+            for t in list(range(r.start, r.stop, self.span)) + [r.stop - 1]:
+                word = self.encode(t, t)
+                if word is not None:
+                    keys.add(word[self.key])
+        pattern = keys and re.compile(b'[' + b''.join(re.escape(bytes((k,)))
+                                      for k in sorted(keys)) + b']')
+
+        self.compiled = (ranges, [r.start for r in ranges], pattern)
+        return self.compiled
+
+    def inside(self, t):
+        """ Whether the offset `t` is within the targeted ranges.
+        """
+        ranges, starts, pattern = self.targets()
+        k = bisect.bisect_right(starts, t) - 1
+
+        return 0 <= k and t < ranges[k].stop
+
+    def scan(self, lo, hi):
+        """ Finds the pointers starting from `lo` to `hi` (excluded).
+
+            Returns a `dict` of `{at: offset}`.
+        """
+        lo = max(0, lo)
+        lo+= -lo % self.align
+        hi = min(hi, self.genome.size - self.width + 1)
+        if hi <= lo:
+            return dict()
+
+        ranges, starts, pattern = self.targets()
+        if not pattern:
+            return dict()
+
+        data = bytes(self.genome.data[lo:hi + self.width - 1])
+        if self.align == 1:
+            found = (m.start() for m in pattern.finditer(data, self.key))
+            found = (k - self.key for k in found)
+        else:
+            keys = data[self.key::self.align]
+            found = (m.start() * self.align for m in pattern.finditer(keys))
+
+        pointers = dict()
+        for k in found:
+            if hi - lo <= k:
+                break
+            v = int.from_bytes(data[k:k + self.width], 'little')
+            t = self.decode(v, lo + k)
+            if t is not None and self.inside(t):
+                pointers[lo + k] = t
+
+        return pointers
+
+    def rescan(self):
+        """ Scans the whole data again.
+        """
+        self.pointers = self.scan(0, self.genome.size)
+
+        return self
+
+    def touch(self, genome, st, old, new):
+        """ Watcher updating the pointers overlapped by an edit.
+
+            If the size of the data changed, the data is scanned again.
+        """
+        if len(old) != len(new):
+            self.rescan()
+            return
+
+        lo, hi = st - self.width + 1, st + len(new)
+        if hi - lo < len(self.pointers):
+            for k in range(lo, hi):
+                self.pointers.pop(k, None)
+        else:
+            for k in [k for k in self.pointers if lo <= k < hi]:
+                del self.pointers[k]
+        self.pointers.update(self.scan(lo, hi))
+
+    def into(self, st, ed):
+        """ Returns the pointers to offsets from `st` to `ed` (excluded), as a
+            sorted list of `(at, offset)`.
+        """
+        return sorted((k, t) for k, t in self.pointers.items() if st <= t < ed)
+
+    def at(self, k):
+        """ Returns the offset pointed to by the word at `k`, or `None`.
+        """
+        return self.pointers.get(k)
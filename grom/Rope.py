@@ -0,0 +1,121 @@
+import bisect
+
+class Rope:
+    """ A `bytearray`-like sequence made of chunks.
+
+        Inserting or deleting in a `bytearray` moves everything after the edit
+        point, which is costly for large data. A `Rope` instead keeps the data
+        in a list of chunks of about `Rope.CHUNK` bytes: an edit only rebuilds
+        the chunks it touches, then shifts the list of their start offsets.
+
+        It supports what `Genome` does with its data: `len`, indexing, slicing
+        (including extended slices) and slice assignment of any size. Use
+        `bytes(rope)` to get the data back contiguous.
+    """
+    CHUNK = 0x10000
+
+    def __init__(self, data=b''):
+        """ Cuts `data` into chunks.
+        """
+        self.chunks = [bytearray(data[k:k + Rope.CHUNK])
+                       for k in range(0, len(data), Rope.CHUNK)]
+        self.reindex(0)
+
+    def reindex(self, k):
+        """ Recomputes the start offsets of the chunks from chunk `k` onward.
+        """
+        if not k:
+            self.starts = []
+        del self.starts[k:]
+
+        at = self.starts[-1] + len(self.chunks[k - 1]) if k else 0
+        for c in self.chunks[k:]:
+            self.starts.append(at)
+            at+= len(c)
+        self.size = at
+
+    def __len__(self):
+        return self.size
+
+    def __bytes__(self):
+        return b''.join(self.chunks)
+
+    def __iter__(self):
+        for c in self.chunks:
+            yield from c
+
+    def find(self, k):
+        """ Returns the index of the chunk containing offset `k`.
+        """
+        return max(0, bisect.bisect_right(self.starts, k) - 1)
+
+    def __getitem__(self, k):
+        """ Gets a byte (as an `int`) or a slice (as a `bytearray`).
+        """
+        if isinstance(k, slice):
+            st, ed, step = k.indices(self.size)
+            if step != 1:
+                lo, hi = (st, ed) if 0 < step else (ed + 1, st + 1)
+                return self[lo:hi][st - lo::step] if lo < hi else bytearray()
+            if ed <= st:
+                return bytearray()
+
+            i, j = self.find(st), self.find(ed - 1)
+            if i == j:
+                return self.chunks[i][st - self.starts[i]:ed - self.starts[i]]
+
+            r = self.chunks[i][st - self.starts[i]:]
+            for c in self.chunks[i + 1:j]:
+                r+= c
+            return r + self.chunks[j][:ed - self.starts[j]]
+
+        if k < 0:
+            k+= self.size
+        if not 0 <= k < self.size:
+            raise IndexError("rope index out of range")
+
+        i = self.find(k)
+        return self.chunks[i][k - self.starts[i]]
+
+    def __setitem__(self, k, v):
+        """ Sets a byte, or replaces a slice by data of any size.
+        """
+        if not isinstance(k, slice):
+            if k < 0:
+                k+= self.size
+            k, v = slice(k, k + 1), (v,)
+
+        st, ed, step = k.indices(self.size)
+        if step != 1:
+            lo, hi = (st, ed) if 0 < step else (ed + 1, st + 1)
+            span = self[lo:hi]
+            span[st - lo::step] = v
+            self[lo:hi] = span
+            return
+
+        ed = max(st, ed)
+        v = bytes(v)
+
+        i = self.find(st)
+        if i < len(self.chunks):
+            a = st - self.starts[i]
+            if ed - st == len(v) and a + len(v) <= len(self.chunks[i]):
+                self.chunks[i][a:a + len(v)] = v # same size: in place
+                return
+
+        if not self.chunks:
+            self.chunks = [bytearray()]
+            self.reindex(0)
+
+        j = self.find(ed - 1) if st < ed else i
+        merged = self.chunks[i][:st - self.starts[i]] + v + \
+                 self.chunks[j][ed - self.starts[j]:]
+
+        self.chunks[i:j + 1] = [merged[n:n + Rope.CHUNK]
+                                for n in range(0, len(merged), Rope.CHUNK)]
+
+        if i and len(self.chunks) > i and len(self.chunks[i]) < Rope.CHUNK // 4:
+            self.chunks[i - 1]+= self.chunks.pop(i) # keep chunks sizeable
+            i-= 1
+
+        self.reindex(i)
@@ -0,0 +1,141 @@
+import grom
+import math
+import threading
+
+class Scheduler:
+    """ Shares the breeding budget among operators, from what they yield.
+
+        Each arm of the scheduler is an `(operator, kwargs)` way of breeding a
+        child: `operator` is the name of a `Genome` method (`"crossover"`
+        taking a second parent) or a function called as `operator(child,
+        **kwargs)`, as in the `operators` of `grom.Evolution`. If `parts` are
+        given, each operator is turned into one arm per partition (`part` is
+        set in its `kwargs`), so that the budget is also shared among the
+        areas of the data.
+
+        Every child bred through an arm is credited with its cost (the seconds
+        spent breeding and evaluating it) and its gain (its fitness minus that
+        of its best parent): a child is useful when its gain is positive.
+        Arms are then picked with an upper confidence bound (UCB1) on their
+        useful children per second, so that the cheap and fruitful ones get
+        most of the budget while the others are still tried now and then.
+        With `decay` below 1, older results weigh less, following the
+        needs of the run as it goes. Arms are picked on the breeding thread of
+        `grom.Evolution` while rewards come from the evaluating one: the
+        statistics are guarded by a lock.
+
+        Give it as the `operators` of `grom.Evolution`:
+        ```python
+        S = Scheduler([("mutate", dict(ratio=.001, sigma=1)),
+                       ("geneswap", dict(amount=2, maxSize=0x10)),
+                       ("crossover", dict())], parts=["Text", "Maps"])
+        G.evolve(evaluate, 50, operators=S)
+        S.report()
+        ```
+    """
+    def __init__(self, operators, parts=None, exploration=1., decay=1.):
+        """ Creates a scheduler over `operators`, see the class documentation.
+        """
+        self.arms = [(operator, kwargs) for operator, kwargs in operators]
+        if parts:
+            self.arms = [(operator, dict(kwargs, part=[p]))
+                         for operator, kwargs in self.arms for p in parts]
+        self.exploration = exploration
+        self.decay = decay
+
+        self.pulls = [0.] * len(self.arms)
+        self.useful = [0.] * len(self.arms)
+        self.cost = [0.] * len(self.arms)
+        self.gain = [0.] * len(self.arms)
+        self.flying = [0] * len(self.arms)
+        self.lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.arms)
+
+    def name(self, k):
+        """ Returns a readable name for the arm `k`.
+        """
+        operator, kwargs = self.arms[k]
+        name = operator if isinstance(operator, str) else operator.__name__
+        if 'part' in kwargs:
+            name+= " " + ", ".join(str(p) for p in kwargs['part'])
+        return name
+
+    def bound(self, k, total):
+        """ Upper bound of the useful children per second of the arm `k`.
+
+            The children not credited yet count towards the exploration
+            term, so that a batch bred at once does not all go to one arm.
+        """
+        n = self.pulls[k]
+        explore = math.sqrt(2 * math.log(total) / (n + self.flying[k]))
+        explore*= self.exploration
+        return (self.useful[k] / n + explore) / max(self.cost[k] / n, 1e-9)
+
+    def pick(self, rand):
+        """ Returns the index of the arm to breed the next child with, to be
+            credited later (see `Scheduler.reward`).
+
+            Arms never tried come first, in a random order.
+        """
+        with self.lock:
+            untried = [k for k in range(len(self.arms)) if not self.pulls[k]]
+            if untried:
+                k = rand.choice(untried)
+            else:
+                total = max(sum(self.pulls) + sum(self.flying), 2.)
+                k = max(range(len(self.arms)),
+                        key=lambda k: self.bound(k, total))
+
+            self.flying[k]+= 1
+        return k
+
+    def reward(self, k, cost, gain=None):
+        """ Credits the arm `k` with a child, of `cost` seconds and `gain`
+            fitness (`None` if it was not evaluated, e.g. rejected).
+        """
+        with self.lock:
+            if self.decay < 1:
+                for stat in (self.pulls, self.useful, self.cost, self.gain):
+                    stat[:] = [v * self.decay for v in stat]
+
+            self.flying[k] = max(0, self.flying[k] - 1)
+            self.pulls[k]+= 1
+            self.cost[k]+= cost
+            if gain is not None:
+                self.useful[k]+= 0 < gain
+                self.gain[k]+= gain
+
+    def shares(self):
+        """ Returns the share of the children bred by each arm.
+        """
+        with self.lock:
+            pulls = list(self.pulls)
+        total = sum(pulls) or 1.
+        return [n / total for n in pulls]
+
+    def report(self):
+        """ Outputs the statistics of every arm (see `grom.util.output`).
+
+            Returns a list of `(name, children, useful, seconds, gain)`.
+        """
+        with self.lock:
+            stats = [(self.name(k), self.pulls[k], self.useful[k],
+                      self.cost[k], self.gain[k]) for k in range(len(self))]
+        for name, n, useful, cost, gain in stats:
+            grom.util.output("{}: {:.0f} children, {:.0f} useful, {:.3f}s "
+                             "({:.1f} useful/s), gain {:+g}".format(
+                             name, n, useful, cost, useful / (cost or 1),
+                             gain))
+
+        return stats
@@ -0,0 +1,149 @@
+import grom
+
+class Selection:
+    """ A set of bytes, described with partitions and set operations.
+
+        A `Selection` is built from a `grom.Partition` (see `Partition.select`)
+        and combined with `|` (union), `&` (intersection), `-` (difference) and
+        `~` (complement, within the size of the partition):
+        ```python
+        text = P.select('Move Names', 'Item Names')
+        safe = ~P.select('Header') - P.select('Pointers')
+        g.mutate(.01, 1, [text & safe])
+        ```
+
+        It compiles to a sorted tuple of disjoint ranges, cached on the
+        partition: using the same selection again costs a dictionary lookup.
+        A `Selection` can be given a name with `Partition.define`, and then
+        be used by name in any `part` list.
+    """
+    def __init__(self, partition, expression):
+        """ Creates a selection, use `Partition.select` instead.
+
+            `expression` is a nested tuple: `('parts', parts)`, `('|', a, b)`,
+            `('&', a, b)`, `('-', a, b)` or `('~', a)`.
+        """
+        self.partition = partition
+        self.expression = expression
+
+    def __or__(self, other):
+        return Selection(self.partition,
+                         ('|', self.expression, other.expression))
+
+    def __and__(self, other):
+        return Selection(self.partition,
+                         ('&', self.expression, other.expression))
+
+    def __sub__(self, other):
+        return Selection(self.partition,
+                         ('-', self.expression, other.expression))
+
+    def __invert__(self):
+        return Selection(self.partition, ('~', self.expression))
+
+    def __hash__(self):
+        return hash(self.expression)
+
+    def __eq__(self, other):
+        return isinstance(other, Selection) and \
+               self.expression == other.expression
+
+    def __iter__(self):
+        """ Iterates over the ranges of the selection.
+        """
+        return iter(self.ranges())
+
+    def __len__(self):
+        """ Returns the number of bytes selected.
+        """
+        return sum(len(r) for r in self.ranges())
+
+    def ranges(self, partition=None):
+        """ Returns the selection as a sorted `tuple` of disjoint `range`s.
+
+            The names are looked up in `partition`, by default the one the
+            selection was made from (a `Genome` whose size changes gets a
+            shifted copy of its partition, see `Partition.shift`). The result
+            is cached on that partition, which drops it whenever it is
+            modified.
+        """
+        if partition is None:
+            partition = self.partition
+        cache = partition.compiled
+        if self.expression not in cache:
+            cache[self.expression] = tuple(self.compile(self.expression,
+                                                        partition))
+        return cache[self.expression]
+
+    @staticmethod
+    def compile(expression, partition):
+        """ Computes the ranges of an `expression` (see `Selection.__init__`)
+            against `partition`.
+        """
+        op, operands = expression[0], expression[1:]
+
+        if op == 'parts':
+            if not operands[0]:
+                return []
+            return Selection.union(list(partition.resolve(operands[0])), [])
+
+        a = Selection.compile(operands[0], partition)
+        if op == '~':
+            return Selection.subtract([range(partition.size)], a)
+
+        b = Selection.compile(operands[1], partition)
+        if op == '|':
+            return Selection.union(a, b)
+        if op == '&':
+            return Selection.intersect(a, b)
+        return Selection.subtract(a, b)
+
+    @staticmethod
+    def union(a, b):
+        """ Union of two lists of ranges, as sorted disjoint ranges.
+
+            Touching ranges are merged as well.
+        """
+        merged = []
+        for r in sorted(a + b, key=lambda r: r.start):
+            if not r:
+                continue
+            if merged and r.start <= merged[-1].stop:
+                last = merged.pop()
+                r = range(last.start, max(last.stop, r.stop))
+            merged.append(r)
+        return merged
+
+    @staticmethod
+    def intersect(a, b):
+        """ Intersection of two lists of sorted disjoint ranges.
+        """
+        result, i, j = [], 0, 0
+        while i < len(a) and j < len(b):
+            st, ed = max(a[i].start, b[j].start), min(a[i].stop, b[j].stop)
+            if st < ed:
+                result.append(range(st, ed))
+            if a[i].stop < b[j].stop:
+                i+= 1
+            else:
+                j+= 1
+        return result
+
+    @staticmethod
+    def subtract(a, b):
+        """ Difference of two lists of sorted disjoint ranges.
+        """
+        result, j = [], 0
+        for r in a:
+            st = r.start
+            while j < len(b) and b[j].stop <= st:
+                j+= 1
+            k = j
+            while k < len(b) and b[k].start < r.stop:
+                if st < b[k].start:
+                    result.append(range(st, b[k].start))
+                st = max(st, b[k].stop)
+                k+= 1
+            if st < r.stop:
+                result.append(range(st, r.stop))
+        return result
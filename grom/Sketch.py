@@ -0,0 +1,80 @@
+import grom
+import bisect
+
+class Sketch:
+    """ A similarity sketch of a `Genome`'s data.
+
+        The sketch keeps the bytes found at `samples` positions, drawn at
+        random once and for all (from a seed and the size of the data). The
+        number of differing bytes between two sketches is then proportional to
+        the Hamming distance between the whole data.
+
+        Sampling bytes rather than hashing blocks keeps the sketch meaningful
+        under scattered mutations: a `mutate` over the whole data touches most
+        of its blocks but only a handful of sampled bytes.
+
+        The sketch registers itself as one of the `Genome`'s watchers, so it
+        follows the edits at the cost of a lookup per edit.
+    """
+    def __init__(self, genome, samples=256, seed=0):
+        """ Sketches `genome`, see `Genome.fingerprint`.
+        """
+        self.samples = samples
+        self.seed = seed
+
+        self.genome = genome
+        genome.watchers.append(self.touch)
+
+        self.resample()
+
+    def copy(self, genome):
+        """ Returns a copy of this sketch, for `genome` (a copy of the data).
+        """
+        other = Sketch.__new__(Sketch)
+        other.samples = self.samples
+        other.seed = self.seed
+        other.positions = self.positions
+        other.values = bytearray(self.values)
+
+        other.genome = genome
+        genome.watchers.append(other.touch)
+
+        return other
+
+    def resample(self):
+        """ Draws the sampled positions and reads their bytes.
+
+            The positions only depend on the seed and the size of the data, so
+            `Genome`s of the same size are always sampled at the same places.
+        """
+        size = self.genome.size
+        rand = grom.util.random.Random(self.seed * 0x100000000 + size)
+        amount = min(self.samples, size)
+        self.positions = sorted(rand.sample(range(size), amount))
+        self.values = bytearray(self.genome.data[k] for k in self.positions)
+
+    def touch(self, genome, st, old, new):
+        """ Watcher updating the sampled bytes covered by an edit.
+
+            If the size of the data changed, every byte after `st` moved, so
+            the sketch is sampled again.
+        """
+        if len(old) != len(new):
+            self.resample()
+            return
+
+        lo = bisect.bisect_left(self.positions, st)
+        hi = bisect.bisect_left(self.positions, st + len(new))
+        for k in range(lo, hi):
+            self.values[k] = new[self.positions[k] - st]
+
+    def fingerprint(self):
+        """ Returns the sampled bytes as a `bytes`.
+        """
+        return bytes(self.values)
+
+    @staticmethod
+    def distance(a, b):
+        """ Number of sampled bytes differing between fingerprints `a` and `b`.
+        """
+        return grom.util.hamming(a, b)
@@ -0,0 +1,200 @@
+import grom
+import array
+import sys
+
+class Validator:
+    """ A cheap check of the data of a `Genome`, run before evaluating it.
+
+        Many children are broken in obvious ways (a bad header, a zeroed entry
+        point, a destroyed pointer table...) and would waste a full evaluation
+        (e.g. an emulator run through `Genome.start`). A validator looks at
+        the bytes of `part` (anything `Partition.resolve` accepts: a partition
+        name, a `range`...) and passes them to `test`, which returns whether
+        they are valid:
+        ```
+        test(data:bytes):bool
+        ```
+
+        A failing `Genome` is either dropped or repaired. `repair` is given
+        the bytes of `part` and returns replacements of the same length, or
+        is a `Genome` (e.g. the original ROM) whose bytes at `part` are copied
+        back. `bulk`, if given, is a quick accept over many `Genome`s at once:
+        it is given the list of their bytes of `part` and returns `True` when
+        they are all valid (usually from a single pass over their
+        concatenation, at C speed), in which case `test` is not called.
+
+        See `Validator.screen` to run validators over many `Genome`s, as do
+        `Generation.prefilter`, `Pipeline.validate` and the `validators` of
+        `grom.Evolution`. Each validator counts what it saw, see
+        `Validator.report`. Ready-made validators are built by the static
+        methods of this class.
+    """
+    GB_LOGO = bytes.fromhex("CEED6666CC0D000B03730083000C000D0008111F8889000E"
+                            "DCCC6EE6DDDDD999BBBB67636E0EECCCDDDC999FBBB9333E")
+
+    def __init__(self, name, part, test, repair=None, bulk=None):
+        """ Creates a validator, see the class documentation.
+        """
+        self.name = name
+        self.part = part
+        self.test = test
+        self.repair = repair
+        self.bulk = bulk
+
+        self.checked = 0
+        self.failed = 0
+        self.repaired = 0
+
+    def __str__(self):
+        rate = self.failed / self.checked if self.checked else 0
+        return "Validator {}: {}/{} failed ({:.1%}), {} repaired".format(
+                self.name, self.failed, self.checked, rate, self.repaired)
+
+    @staticmethod
+    def equals(name, part, expected):
+        """ The bytes of `part` must be `expected`; repaired by writing it.
+        """
+        expected = bytes(expected)
+        return Validator(name, part, lambda data: data == expected,
+                         lambda data: expected,
+                         lambda datas: b''.join(datas) == expected *
+                                                           len(datas))
+
+    @staticmethod
+    def within(name, part, lo, hi):
+        """ Every byte of `part` must be from `lo` to `hi` (included);
+            repaired by clamping the others.
+        """
+        allowed = bytes(range(lo, hi + 1))
+        clamp = bytes(min(max(v, lo), hi) for v in range(256))
+
+        def test(data):
+            return not data.translate(None, allowed)
+
+        return Validator(name, part, test, lambda data: data.translate(clamp),
+                         lambda datas: test(b''.join(datas)))
+
+    @staticmethod
+    def nonzero(name, part):
+        """ The bytes of `part` must not all be zeros (not repaired).
+        """
+        return Validator(name, part,
+                         lambda data: data.count(0) < len(data))
+
+    @staticmethod
+    def table(name, part, lo, hi, width=2, byteorder='little'):
+        """ Every `width` bytes entry of `part` (e.g. a pointer table) must be
+            from `lo` to `hi` (included); not repaired.
+
+            Entries are read as an `array`, so that their bounds are found at
+            C speed.
+        """
+        typecode = {1: 'B', 2: 'H', 4: 'I'}[width]
+
+        def bounds(data):
+            entries = array.array(typecode, data[:len(data) // width * width])
+            if byteorder != sys.byteorder:
+                entries.byteswap()
+            return entries and (min(entries), max(entries))
+
+        def test(data):
+            found = bounds(data)
+            return not found or lo <= found[0] and found[1] <= hi
+
+        return Validator(name, part, test, None,
+                         lambda datas: all(len(d) % width == 0 for d in datas)
+                                       and test(b''.join(datas)))
+
+    @staticmethod
+    def gbLogo():
+        """ Game Boy Nintendo logo, from 0x104 to 0x133 (repaired).
+        """
+        return Validator.equals("GB logo", range(0x104, 0x134),
+                                Validator.GB_LOGO)
+
+    @staticmethod
+    def gbEntry():
+        """ Game Boy entry point, from 0x100 to 0x103, must not be zeroed.
+        """
+        return Validator.nonzero("GB entry", range(0x100, 0x104))
+
+    @staticmethod
+    def gba():
+        """ Game Boy Advance fixed value 0x96, at 0xB2 (repaired).
+        """
+        return Validator.equals("GBA fixed", range(0xB2, 0xB3), b'\x96')
+
+    def data(self, genome):
+        """ Returns the bytes of `part` in `genome`.
+        """
+        return b''.join(bytes(genome.data[r.start:r.stop])
+                        for r in genome.partition.resolve([self.part]))
+
+    def failing(self, genomes):
+        """ Returns the indexes of the `genomes` failing the validator.
+        """
+        datas = [self.data(g) for g in genomes]
+        self.checked+= len(datas)
+        if self.bulk and datas and self.bulk(datas):
+            return []
+
+        failed = [k for k, d in enumerate(datas) if not self.test(d)]
+        self.failed+= len(failed)
+
+        return failed
+
+    def fix(self, genome):
+        """ Repairs `genome`, returning whether it now passes.
+        """
+        if self.repair is None:
+            return False
+
+        if isinstance(self.repair, grom.Genome):
+            new = self.data(self.repair)
+        else:
+            new = bytes(self.repair(self.data(genome)))
+
+        ranges = genome.partition.resolve([self.part])
+        if len(new) != sum(len(r) for r in ranges):
+            return False
+
+        k = 0
+        for r in ranges:
+            if genome.data[r.start:r.stop] != new[k:k + len(r)]:
+                genome.edit(r.start, r.stop, new[k:k + len(r)])
+            k+= len(r)
+
+        if not self.test(self.data(genome)):
+            return False
+        self.repaired+= 1
+
+        return True
+
+    @staticmethod
+    def screen(validators, genomes, repair=False):
+        """ Runs `validators` over `genomes`, in bulk.
+
+            Each validator is run over the `Genome`s still valid, in order (so
+            the cheapest should come first). If `repair` is set, the failing
+            ones are repaired where possible. Returns the list of the valid
+            (or repaired) `Genome`s and the list of the rejected ones.
+        """
+        kept, rejected = list(genomes), []
+        for v in validators:
+            bad = {k for k in v.failing(kept)
+                   if not (repair and v.fix(kept[k]))}
+            rejected+= [g for k, g in enumerate(kept) if k in bad]
+            kept = [g for k, g in enumerate(kept) if k not in bad]
+
+        return kept, rejected
+
+    @staticmethod
+    def report(validators):
+        """ Outputs the counts of every validator (see `grom.util.output`).
+
+            Returns a list of `(name, checked, failed, repaired)`.
+        """
+        for v in validators:
+            grom.util.output(str(v))
+
+        return [(v.name, v.checked, v.failed, v.repaired) for v in validators]
@@ -1,9 +1,26 @@
 from grom.Genome import Genome
 from grom.Partition import Partition
+from grom.Selection import Selection
 from grom.Generation import Generation
+from grom.Pipeline import Pipeline
+from grom.Sketch import Sketch
+from grom.Index import Index
+from grom.Evolution import Evolution
+from grom.Rope import Rope
+from grom.Checksum import Checksum
+from grom.Pointers import Pointers
+from grom.Compression import Compression
+from grom.Image import Image
+from grom.Attribution import Attribution
+from grom.Validator import Validator
+from grom.Scheduler import Scheduler
+from grom.Farm import Farm
 import grom.util as util
 
 def debug(set):
     util.DEBUG = set
 
-__all__ = ['Genome', 'Generation', 'Partition', 'debug']
+__all__ = ['Genome', 'Generation', 'Pipeline', 'Partition', 'Selection',
+           'Sketch', 'Index', 'Evolution', 'Rope', 'Checksum', 'Pointers',
+           'Compression', 'Image', 'Attribution', 'Validator', 'Scheduler',
+           'Farm', 'debug']
@@ -0,0 +1,150 @@
+""" Batch command line entry point.
+
+    Runs a declarative pipeline over many input files and seeds:
+    ```
+    python -m grom config.json
+    ```
+
+    The configuration is a JSON object:
+    ```
+    {
+        "inputs": ["roms/*.gb"],          // paths or glob patterns
+        "partition": {                    // optional, or a list of
+            "file": "roms/rom_map.rps",   // [name, end] / [name, start, end]
+            "parser": "address"           // "address", "range" or
+        },                                // "module:function"
+        "checksums": ["gbHeader", "gbGlobal"], // see `grom.Checksum`
+        "operators": [                    // see `grom.Evolution.__init__`
+            [1.0, "mutate", {"ratio": 0.001, "sigma": 1, "part": ["Data"]}],
+            [0.5, "geneswap", {"amount": 4, "maxSize": 8}]
+        ],
+        "population": 16,                 // outputs per input and seed
+        "seeds": [0, 1, 2],               // or a number of seeds
+        "workers": 4,                     // default to the number of cores
+        "output": "dump/{input}_{seed}_{index}{ext}"
+    }
+    ```
+    (comments are not valid JSON, of course.)
+
+    Every (input, seed) pair is a job, run on a pool of worker processes.
+    Within a job, each of the `population` outputs is a copy of the input
+    run through the `operators` with its own random (seeded from the seed and
+    its index, so runs can be reproduced). A throughput summary is printed at
+    the end.
+"""
+
+import grom
+import argparse
+import glob
+import importlib
+import json
+import os
+import sys
+import time
+
+def partition(config, size):
+    """ Builds the `grom.Partition` described by the configuration.
+    """
+    spec = config.get("partition")
+    if not spec:
+        return grom.Partition(size)
+
+    if isinstance(spec, list):
+        parts = []
+        for p in spec:
+            if len(p) == 3:
+                parts.append((p[0], range(p[1], p[2])))
+            else:
+                parts.append(tuple(p) if 1 < len(p) else p[0])
+        return grom.Partition(size, parts)
+
+    parser = spec.get("parser", "address")
+    if ":" in parser:
+        module, function = parser.split(":", 1)
+        parser = getattr(importlib.import_module(module), function)
+    else:
+        parser = getattr(grom.Partition, "parse" + parser.capitalize())
+
+    return grom.Partition(spec.get("size", size), spec["file"], parser)
+
+def job(config, part, path, seed):
+    """ Runs the pipeline of `config` for one input file and one seed.
+
+        Returns the number of outputs and of bytes written.
+    """
+    debug, grom.util.DEBUG = grom.util.DEBUG, False
+    try:
+        base = grom.Genome(path, name=path).setPartition(part)
+        base.addChecksum(*[getattr(grom.Checksum, c)()
+                           for c in config.get("checksums", [])])
+
+        name, ext = os.path.splitext(os.path.basename(path))
+        pattern = config.get("output", "{input}_{seed}_{index}{ext}")
+        operators = config.get("operators", [])
+        count, written = 0, 0
+
+        for index in range(config.get("population", 1)):
+            child = base.copy()
+            child.rand.seed("{}:{}".format(seed, index))
+            grom.Evolution.operate(child, operators, child.rand)
+
+            file = pattern.format(input=name, ext=ext, seed=seed, index=index)
+            if os.path.dirname(file):
+                os.makedirs(os.path.dirname(file), exist_ok=True)
+            child.save(file)
+
+            count+= 1
+            written+= child.size
+    finally:
+        grom.util.DEBUG = debug
+
+    return count, written
+
+def main(argv=None):
+    """ Parses the command line and runs the batch.
+    """
+    cli = argparse.ArgumentParser(prog="python -m grom",
+                                  description="Batch genome manipulation.")
+    cli.add_argument("config", help="path to the JSON configuration")
+    cli.add_argument("-j", "--workers", type=int,
+                     help="number of worker processes (overrides config)")
+    args = cli.parse_args(argv)
+
+    with open(args.config, 'r') as f:
+        config = json.load(f)
+
+    inputs = config.get("inputs", [])
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    paths = [p for i in inputs for p in (sorted(glob.glob(i)) or [i])]
+    if not paths:
+        cli.error("no input file")
+
+    seeds = config.get("seeds", [0])
+    if isinstance(seeds, int):
+        seeds = range(seeds)
+
+    part = partition(config, os.path.getsize(paths[0]))
+    workers = args.workers or config.get("workers")
+    tasks = [(config, part, p, s) for p in paths for s in seeds]
+
+    start = time.perf_counter()
+    count, written = 0, 0
+
+    pr = grom.util.Progress("Running", len(tasks))
+    for c, w in grom.util.parallel(job, tasks, workers):
+        count+= c
+        written+= w
+        pr.update()
+    del pr
+
+    elapsed = time.perf_counter() - start
+    print("{} jobs, {} outputs, {:,}b written in {:.2f}s".format(
+            len(tasks), count, written, elapsed))
+    print("{:.1f} outputs/s, {:.1f} Mb/s".format(
+            count / elapsed, written / elapsed / 0x100000))
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
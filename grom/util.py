@@ -6,6 +6,8 @@
 
 import random
 import os
+import collections
+from concurrent import futures
 
 DEBUG = __debug__
 LINE_SIZE = 80
@@ -27,6 +29,95 @@ def randit(it, rand=None):
     """
     return it[(rand or random.Random()).randrange(0, len(it))]
 
+def hamming(a, b):
+    """ Number of differing bytes between `a` and `b`.
+
+        Both are XORed as big integers so the comparison runs at C speed
+        rather than byte by byte. If sizes differ, the extra bytes of the
+        longest one all count as differences.
+    """
+    n = min(len(a), len(b))
+    x = int.from_bytes(a[:n], 'little') ^ int.from_bytes(b[:n], 'little')
+    return n - x.to_bytes(n, 'little').count(0) + abs(len(a) - len(b))
+
+def histogram(data):
+    """ Byte histogram of `data`.
+
+        Returns a list of 256 counts, the number of occurrences of each byte
+        value in `data`.
+    """
+    c = collections.Counter(data)
+    return [c[v] for v in range(256)]
+
+def distances(slices, pairs):
+    """ Hamming distances for `pairs` of indices into `slices`.
+
+        Used as the unit of work of `grom.Generation.distances`: it is a plain
+        module-level function so it can be sent to worker processes.
+    """
+    return [hamming(slices[i], slices[j]) for i, j in pairs]
+
+def parallel(do, tasks, workers=None, threads=False):
+    """ Maps `do` over `tasks` on a pool of workers.
+
+        Yields `do(*task)` for each task of `tasks`, in order. At most twice
+        `workers` tasks are in flight at a time, so `tasks` can be a generator
+        producing large arguments lazily without them all piling up in memory.
+
+        `workers` defaults to the number of cores, `1` runs everything in the
+        calling thread. Processes are used unless `threads` is set (which only
+        pays off if `do` releases the GIL, like I/O does).
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for t in tasks:
+            yield do(*t)
+        return
+
+    if threads:
+        pool = futures.ThreadPoolExecutor(workers)
+    else:
+        pool = futures.ProcessPoolExecutor(workers)
+
+    with pool as ex:
+        pending = collections.deque()
+        for t in tasks:
+            pending.append(ex.submit(do, *t))
+            if 2 * workers <= len(pending):
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def copyFile(src, dst, size):
+    """ Copies `size` bytes from file `src` to file `dst`, within the kernel.
+
+        Uses `os.copy_file_range` (or else `os.sendfile`) so the data does not
+        go through Python's memory. Falls back on a plain copy when neither is
+        available (or supported by the file systems).
+    """
+    fin, fout = src.fileno(), dst.fileno()
+
+    for copy in ("copy_file_range", "sendfile"):
+        if hasattr(os, copy):
+            try:
+                k = 0
+                while k < size:
+                    if copy == "sendfile":
+                        n = os.sendfile(fout, fin, k, size - k)
+                    else:
+                        n = os.copy_file_range(fin, fout, size - k, k, k)
+                    if not n:
+                        break
+                    k+= n
+                if k == size:
+                    return
+            except OSError:
+                pass
+
+    src.seek(0)
+    dst.seek(0)
+    dst.write(src.read(size))
+
 class Progress:
     """ A progress bar.
 
@@ -0,0 +1,42 @@
+import grom
+import random
+import unittest
+
+grom.debug(False)
+
+class TestAlignment(unittest.TestCase):
+    def parents(self):
+        rand = random.Random(0x43)
+        data = rand.randbytes(0x4000)
+        partition = [("Code", range(0, 0x2000)),
+                     ("Text", range(0x2000, 0x4000))]
+        a = grom.Genome(data, True, "a", rand=1, partition=partition)
+        b = grom.Genome(data[:0x800] + rand.randbytes(0x300) + data[0x800:],
+                        True, "b", rand=2)
+        return a, b
+
+    def test_inheritance(self):
+        a, b = self.parents()
+        a.indexPointers(grom.Pointers.gb(["Text"]))
+        a.addCompressed(grom.Compression.lz77(), "Text")
+        a.attribute(0x100)
+
+        child = a.alignedCrossover(b, crosser=lambda x, y, k: y,
+                                   average=0x100)
+        self.assertEqual(child.size, b.size)
+        self.assertEqual(bytes(child.data), bytes(b.data))
+        self.assertEqual(child.partition["Code"], range(0, 0x2300))
+        self.assertEqual(child.partition["Text"], range(0x2300, 0x4300))
+        self.assertEqual(len(child.pointers), 1)
+        self.assertEqual(dict(child.pointers[0]),
+                         dict(grom.Pointers.gb(["Text"]).attach(child)))
+        self.assertIn("Text", child.compressed)
+        self.assertIsNone(child.attribution) # not of the same size
+
+        same = a.alignedCrossover(a.copy(), average=0x100)
+        self.assertIs(same.partition, a.partition)
+        self.assertEqual(list(same.attribution.counts),
+                         list(a.attribution.counts))
+
+if __name__ == '__main__':
+    unittest.main()
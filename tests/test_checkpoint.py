@@ -0,0 +1,59 @@
+import grom
+import tempfile
+import unittest
+
+grom.debug(False)
+
+class TestCheckpoint(unittest.TestCase):
+    PARTITION = [("A", range(0, 1000)), ("B", range(1000, 4000))]
+
+    def generation(self, count=4):
+        G = grom.Generation(self.PARTITION)
+        for k in range(count):
+            G.append(grom.Genome(bytes(range(256)) * 16, True, str(k),
+                                 rand=k))
+        return G
+
+    def test_resizedPartition(self):
+        G = self.generation()
+        G['0'].insert(3, 50, ["A"])
+        G['1'].delete(3, 50, ["B"])
+
+        with tempfile.TemporaryDirectory() as path:
+            G.checkpoint(path).flush()
+            H, meta = grom.Generation.resume(path)
+
+        for n, g in G:
+            self.assertEqual(bytes(H[n].data), bytes(g.data))
+            self.assertEqual(list(H[n].partition), list(g.partition))
+        self.assertEqual(len(H['0']["B"]), 3000)
+        self.assertIs(H['2'].partition, H.partition)
+
+    def test_resumeDeterminism(self):
+        G = self.generation()
+        with tempfile.TemporaryDirectory() as path:
+            G.checkpoint(path, meta=1)
+            G['1'].mutate(.01, 4)
+            G.append(G['2'].copy("4"))
+            del G.genomes['0']
+            G.checkpoint(path, meta=2).flush()
+            H, meta = grom.Generation.resume(path)
+
+            self.assertEqual(meta, 2)
+            self.assertEqual(sorted(H.genomes), sorted(G.genomes))
+            for n, g in G:
+                self.assertEqual(bytes(H[n].data), bytes(g.data))
+                H[n].mutate(.05, 8)
+                g.mutate(.05, 8)
+                self.assertEqual(bytes(H[n].data), bytes(g.data))
+
+            H.checkpoint(path).flush() # continues the same directory
+            self.assertEqual(len(grom.Generation.resume(path)[0]), len(G))
+
+    def test_empty(self):
+        with tempfile.TemporaryDirectory() as path:
+            with self.assertRaises(ValueError):
+                grom.Generation().checkpoint(path)
+
+if __name__ == '__main__':
+    unittest.main()
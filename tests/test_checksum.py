@@ -0,0 +1,53 @@
+import grom
+import random
+import unittest
+
+grom.debug(False)
+
+class TestChecksum(unittest.TestCase):
+    def genome(self, size=0x8000):
+        rand = random.Random(0x34)
+        return grom.Genome(rand.randbytes(size), True, rand=0x34,
+                           partition=[("Header", range(0, 0x150)),
+                                      ("Rest", range(0x150, size))])
+
+    def test_incremental(self):
+        g = self.genome()
+        g.addChecksum(grom.Checksum.gbHeader(), grom.Checksum.gbGlobal())
+
+        g.mutate(.01, 8)
+        g.geneswap(20, 32)
+        g.apply(lambda v: v ^ 0xFF, [range(0x130, 0x160)])
+        g.edit(0x14D, 0x150, b'\x01\x02\x03') # the fields themselves
+        for c in g.checksums:
+            self.assertTrue(c.verify()[0])
+
+        g.fixChecksums()
+        for c in g.checksums:
+            self.assertEqual(c.verify(), (True, True))
+
+    def test_resized(self):
+        g = self.genome()
+        g.addChecksum(grom.Checksum.gbHeader(), grom.Checksum.gbGlobal())
+
+        g.insert(5, 16, ["Rest"])
+        g.delete(5, 16, ["Rest"])
+        g.edit(0x140, 0x142, b'\x00') # within the header checksum
+        for c in g.checksums:
+            self.assertTrue(c.verify()[0])
+
+    def test_copy(self):
+        g = self.genome()
+        g.addChecksum(grom.Checksum.gbHeader(), grom.Checksum.gbGlobal())
+        g.fixChecksums()
+
+        child = g.copy()
+        child.mutate(.01, 8)
+        crossed = g.crossover(child, part=["Header", "Rest"])
+        for h in (child, crossed):
+            for c in h.checksums:
+                self.assertIs(c.genome, h)
+                self.assertTrue(c.verify()[0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import grom
+import random
+import unittest
+
+grom.debug(False)
+
+class TestCompression(unittest.TestCase):
+    def samples(self):
+        rand = random.Random(0x39)
+        yield b''
+        yield b'\x00'
+        yield bytes(1000)
+        yield rand.randbytes(777)
+        yield b'ABCD' * 300 + rand.randbytes(50) + b'ABCD' * 10
+        yield bytes(rand.choice(b'\x00\x01\xFF') for k in range(5000))
+
+    def test_lz77(self):
+        c = grom.Compression.lz77()
+        for data in self.samples():
+            packed = c.compress(data)
+            self.assertEqual(packed[0], 0x10)
+            self.assertEqual(len(packed) % 4, 0)
+            self.assertEqual(bytes(c.decompress(packed)), data)
+
+    def test_rle(self):
+        c = grom.Compression.rle()
+        for data in self.samples():
+            packed = c.compress(data)
+            self.assertEqual(packed[0], 0x30)
+            self.assertEqual(bytes(c.decompress(packed)), data)
+
+    def test_wrongType(self):
+        with self.assertRaises(ValueError):
+            grom.Compression.lz77().decompress(b'\x30\x01\x00\x00\x00')
+
+    def test_packKeepsSize(self):
+        c = grom.Compression.lz77()
+        block = c.compress(bytes(600))
+        data = b'\xAA' * 16 + block + b'\xBB' * 100
+        g = grom.Genome(data, True, rand=1, partition=[
+                ("head", range(0, 16)),
+                ("block", range(16, 16 + len(block))),
+                ("tail", range(16 + len(block), len(data)))])
+        g.addCompressed(c, "block")
+
+        g.mutate(.5, (1, 255), ["block"]) # does not compress anymore
+        child = g.copy()
+        self.assertEqual(g.size, len(data))
+        self.assertEqual(child.size, len(data))
+        self.assertEqual(bytes(child["tail"]), b'\xBB' * 100)
+
+        g = grom.Genome(data, True, rand=1, partition=g.partition)
+        g.addCompressed(c, "block")
+        g.apply(lambda v: 1, ["block"]) # still compresses well
+        g.pack()
+        self.assertEqual(g.size, len(data))
+        self.assertEqual(bytes(c.decompress(bytes(g["block"]))), b'\x01' * 600)
+
+    def genome(self, c, rand=1):
+        block = c.compress(bytes(range(64)) * 8)
+        data = b'\xAA' * 100 + block + b'\xBB' * 100
+        return grom.Genome(data, True, rand=rand, partition=[
+                ("head", range(0, 100)),
+                ("block", range(100, 100 + len(block))),
+                ("tail", range(100 + len(block), len(data)))]) \
+                   .addCompressed(c, "block")
+
+    def test_rollbackBlock(self):
+        c = grom.Compression.lz77()
+        g = self.genome(c)
+        data = bytes(g.data)
+
+        g.begin()
+        g.apply(lambda v: 7, ["block"])
+        g.rollback()
+        self.assertEqual(bytes(g.pack().data), data)
+
+        g.apply(lambda v: 7, ["block"])
+        with g.transaction():
+            g.mutate(.1, 1, ["head"])
+        self.assertEqual(bytes(c.expand(bytes(g["block"]))), b'\x07' * 512)
+
+    def test_rawOperators(self):
+        c = grom.Compression.lz77()
+        g = self.genome(c)
+        block = bytes(g["block"])
+
+        g.mutate(.3, 1)
+        g.mutate(.3, 1, [range(0, g.size)])
+        g.geneswap(10, 8)
+        g.delete(10, 8)
+        g.insert(10, 8)
+        g.duplicate(10, 8)
+        self.assertEqual(bytes(g["block"]), block)
+        self.assertNotEqual(bytes(g.block("block").data),
+                            bytes(range(64)) * 8)
+
+    def test_deletionDropsBlock(self):
+        g = self.genome(grom.Compression.lz77())
+        g.block("block")
+        end = g.partition["block"].stop
+        g.edit(end - 5, end + 20, b'')
+        self.assertNotIn("block", g.blocks)
+
+if __name__ == '__main__':
+    unittest.main()
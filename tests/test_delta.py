@@ -0,0 +1,49 @@
+import grom
+import random
+import unittest
+
+grom.debug(False)
+
+class TestDelta(unittest.TestCase):
+    def setUp(self):
+        self.base = random.Random(0x29).randbytes(0x2000)
+
+    def roundTrip(self, g):
+        delta = g.delta(self.base)
+        patched = grom.Genome(self.base, True).patch(delta)
+        self.assertEqual(patched.size, g.size)
+        self.assertEqual(bytes(patched.data), bytes(g.data))
+        return delta
+
+    def test_identical(self):
+        g = grom.Genome(self.base, True)
+        self.assertEqual(self.roundTrip(g), (len(self.base), []))
+
+    def test_edits(self):
+        g = grom.Genome(self.base, True, rand=0x29)
+        g.mutate(.01, 8)
+        g.edit(0, 3, b'\x00\x01\x02')
+        g.edit(g.size - 1, g.size, bytes((self.base[-1] ^ 1,)))
+        size, runs = self.roundTrip(g)
+        self.assertLess(sum(len(d) for st, d in runs), len(self.base) // 10)
+
+    def test_sizes(self):
+        g = grom.Genome(self.base, True, rand=0x29)
+        g.insert(3, 50)
+        self.roundTrip(g)
+
+        g = grom.Genome(self.base, True, rand=0x29)
+        g.delete(3, 50)
+        self.roundTrip(g)
+
+        g = grom.Genome(self.base[:100], True)
+        self.roundTrip(g)
+
+    def test_genomeBase(self):
+        a = grom.Genome(self.base, True, rand=1).mutate(.01, 8)
+        b = grom.Genome(self.base, True, rand=2).mutate(.01, 8)
+        patched = grom.Genome(bytes(a.data), True).patch(b.delta(a))
+        self.assertEqual(bytes(patched.data), bytes(b.data))
+
+if __name__ == '__main__':
+    unittest.main()
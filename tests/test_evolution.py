@@ -0,0 +1,34 @@
+import grom
+import unittest
+
+grom.debug(False)
+
+def evaluate(genomes):
+    return [sum(g.data) for g in genomes]
+
+class TestEvolution(unittest.TestCase):
+    def generation(self, count=6):
+        G = grom.Generation()
+        for k in range(count):
+            G.append(grom.Genome(bytes(range(64)), True, str(k), rand=k))
+        return G
+
+    def test_runsAgain(self):
+        G = self.generation()
+        G.evolve(evaluate, 3, rand=1)
+        G.evolve(evaluate, 3, rand=2)
+        E = G.evolve(evaluate, 3, rand=3, mode="steady")
+
+        self.assertEqual(len(G), 6)
+        self.assertEqual(set(E.fitness), set(G.genomes))
+        for n, g in G:
+            self.assertEqual(n, g.name)
+
+    def test_mismatchedName(self):
+        G = self.generation()
+        G['x'] = grom.Genome(bytes(64), True, name='y')
+        with self.assertRaises(ValueError):
+            G.evolve(evaluate, 1)
+
+if __name__ == '__main__':
+    unittest.main()
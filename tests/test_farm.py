@@ -0,0 +1,42 @@
+import grom
+import socket
+import unittest
+
+grom.debug(False)
+
+def evaluate(genomes):
+    return [sum(g.data) for g in genomes]
+
+class TestFarm(unittest.TestCase):
+    def test_job(self):
+        key = bytes(range(32))
+        for delta in ((0, []), (100, [(0, b'\x01')]),
+                      (1 << 40, [(3, b'abc'), (1 << 33, bytes(300))])):
+            for name in ("g1", "", "résumé"):
+                payload = grom.Farm.job(7, name, key, delta)
+                self.assertEqual(grom.Farm.unjob(payload),
+                                 (7, name, key, delta))
+
+    def test_messages(self):
+        a, b = socket.socketpair()
+        with a, b:
+            grom.Farm.send(a, b'J', b'hello')
+            grom.Farm.send(a, b'B', b'')
+            grom.Farm.send(a, b'R', bytes(0x30000))
+            self.assertEqual(grom.Farm.receive(b), (b'J', b'hello'))
+            self.assertEqual(grom.Farm.receive(b), (b'B', b''))
+            self.assertEqual(grom.Farm.receive(b), (b'R', bytes(0x30000)))
+
+            a.sendall(b'J\x00\x00') # cut in the middle of a header
+            a.close()
+            self.assertIsNone(grom.Farm.receive(b))
+
+    def test_evaluate(self):
+        base = grom.Genome(bytes(range(256)) * 4, True, rand=0x46)
+        genomes = [base.copy(str(k)).mutate(.05, 8) for k in range(6)]
+        with grom.Farm(base) as F:
+            F.spawn(evaluate, 2, slots=2, threads=True)
+            self.assertEqual(F.evaluate(genomes), evaluate(genomes))
+
+if __name__ == '__main__':
+    unittest.main()
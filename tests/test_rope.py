@@ -0,0 +1,96 @@
+import grom
+import random
+import unittest
+
+class TestRope(unittest.TestCase):
+    def setUp(self):
+        self.chunk, grom.Rope.CHUNK = grom.Rope.CHUNK, 16 # many chunks
+
+    def tearDown(self):
+        grom.Rope.CHUNK = self.chunk
+
+    def test_roundTrip(self):
+        rand = random.Random(0x32)
+        for size in (0, 1, 15, 16, 17, 300):
+            data = rand.randbytes(size)
+            rope = grom.Rope(data)
+            self.assertEqual(len(rope), size)
+            self.assertEqual(bytes(rope), data)
+            self.assertEqual(bytes(rope[:]), data)
+
+    def test_edits(self):
+        rand = random.Random(0x32)
+        ref = bytearray(rand.randbytes(200))
+        rope = grom.Rope(ref)
+
+        for n in range(500):
+            st = rand.randrange(len(ref) + 1)
+            ed = rand.randrange(st, min(len(ref), st + 40) + 1)
+            value = rand.randbytes(rand.choice((ed - st, rand.randrange(40))))
+            ref[st:ed] = value
+            rope[st:ed] = value
+            self.assertEqual(len(rope), len(ref))
+
+            if n % 50 == 0:
+                self.assertEqual(bytes(rope), bytes(ref))
+
+        self.assertEqual(bytes(rope), bytes(ref))
+        for k in (0, 5, len(ref) // 2, len(ref) - 1, -1):
+            self.assertEqual(rope[k], ref[k])
+        for s in (slice(3, 90), slice(None, None, 7), slice(80, 10, -3),
+                  slice(-20, None)):
+            self.assertEqual(bytes(rope[s]), bytes(ref[s]))
+
+    def test_extendedAssignment(self):
+        ref = bytearray(range(100))
+        rope = grom.Rope(ref)
+        ref[5:90:4] = bytes(len(range(5, 90, 4)))
+        rope[5:90:4] = bytes(len(range(5, 90, 4)))
+        rope[-1] = ref[-1] = 0xFF
+        self.assertEqual(bytes(rope), bytes(ref))
+
+    def test_genomeShift(self):
+        g = grom.Genome(bytes(100), True,
+                        partition=[("A", range(0, 50)), ("B", range(50, 100))])
+        g.edit(10, 10, b'\x01' * 30)
+        g.edit(0, 5, b'')
+        self.assertEqual(g.size, 125)
+        self.assertEqual(g.partition["B"], range(75, 125))
+        self.assertEqual(bytes(g.materialize().data),
+                         bytes(5) + b'\x01' * 30 + bytes(90))
+
+    def test_rollbackShift(self):
+        g = grom.Genome(bytes(range(256)) * 20, True,
+                        partition=[("A", range(0, 1000)),
+                                   ("B", range(1000, 3000)),
+                                   ("C", range(3000, 5120))])
+        data, partition = bytes(g.data), list(g.partition)
+
+        g.begin()
+        g.edit(900, 1100, b'')
+        g.edit(1000, 3000, b'')
+        g.edit(10, 10, b'\x01' * 50)
+        g.rollback()
+        self.assertEqual(bytes(g.data), data)
+        self.assertEqual(list(g.partition), partition)
+
+        g.begin()
+        g.insert(5, 40, ["B"])
+        g.begin()
+        g.delete(5, 300, ["A", "B"])
+        g.rollback()
+        g.duplicate(5, 300)
+        g.rollback()
+        self.assertEqual(bytes(g.data), data)
+        self.assertEqual(list(g.partition), partition)
+
+    def test_insertGrowsPart(self):
+        for k in range(50):
+            g = grom.Genome(bytes(10), True, rand=k,
+                            partition=[("A", range(0, 2)), ("B", range(2, 10))])
+            g.insert(1, 4, ["A"])
+            self.assertEqual(len(g.partition["B"]), 8)
+            self.assertEqual(g.size, len(g.partition["A"]) + 8)
+
+if __name__ == '__main__':
+    unittest.main()
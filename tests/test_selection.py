@@ -0,0 +1,61 @@
+import grom
+import unittest
+
+class TestSelection(unittest.TestCase):
+    def partition(self):
+        return grom.Partition(100, [("A", range(0, 20)),
+                                    ("B", range(20, 50)),
+                                    ("C", range(40, 70)),
+                                    ("D", range(70, 100))])
+
+    def test_operations(self):
+        P = self.partition()
+        a, b, c = P.select("A"), P.select("B"), P.select("C")
+
+        self.assertEqual(list(a | b), [range(0, 50)])
+        self.assertEqual(list(a | c), [range(0, 20), range(40, 70)])
+        self.assertEqual(list(b & c), [range(40, 50)])
+        self.assertEqual(list(a & c), [])
+        self.assertEqual(list(b - c), [range(20, 40)])
+        self.assertEqual(list(~b), [range(0, 20), range(50, 100)])
+        self.assertEqual(list(~P.select() - c), [range(0, 40), range(70, 100)])
+        self.assertEqual(len((a | c) - P.select(range(10, 45))), 35)
+
+    def test_ranges(self):
+        self.assertEqual(grom.Selection.union([range(5, 8), range(0, 3)],
+                                              [range(3, 4), range(7, 9)]),
+                         [range(0, 4), range(5, 9)])
+        self.assertEqual(grom.Selection.intersect(
+                [range(0, 10), range(20, 30)], [range(5, 25)]),
+                [range(5, 10), range(20, 25)])
+        self.assertEqual(grom.Selection.subtract(
+                [range(0, 10), range(20, 30)], [range(2, 4), range(8, 22)]),
+                [range(0, 2), range(4, 8), range(22, 30)])
+
+    def test_resolve(self):
+        P = self.partition()
+        self.assertEqual(P.resolve(["B", "C"]), (range(20, 70),))
+        self.assertEqual(P.resolve(["A", "B"]), (range(0, 20), range(20, 50)))
+        self.assertEqual(P.resolve([3, range(10, 15), "A"]),
+                         (range(0, 20), range(70, 100)))
+        self.assertEqual(P.resolve([]), (range(0, 20), range(20, 70),
+                                         range(70, 100)))
+        self.assertIs(P.resolve(["B", "C"]), P.resolve(["B", "C"]))
+
+        P.define("Middle", P.select("B") - P.select("C"))
+        self.assertEqual(P.resolve(["Middle", "D"]),
+                         (range(20, 40), range(70, 100)))
+
+    def test_invalidate(self):
+        P = self.partition()
+        s = P.select("B")
+        before = P.resolve([s])
+        P["B"] = range(20, 30)
+        self.assertEqual(before, (range(20, 50),))
+        self.assertEqual(P.resolve([s]), (range(20, 30),))
+
+        Q = P.shift(0, 0, 10)
+        self.assertEqual(s.ranges(Q), (range(30, 40),))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import grom
+import unittest
+
+grom.debug(False)
+
+class TestTransaction(unittest.TestCase):
+    def genome(self):
+        return grom.Genome(bytes(range(256)) * 4, True, rand=0x31,
+                           partition=[("A", range(0, 512)),
+                                      ("B", range(512, 1024))])
+
+    def test_rollback(self):
+        g = self.genome()
+        data, watchers = bytes(g.data), list(g.watchers)
+
+        g.begin()
+        g.mutate(.1, 8)
+        g.geneswap(5, 16)
+        g[1] = b'\xFF' * 512 # partition B
+        self.assertNotEqual(bytes(g.data), data)
+        g.rollback()
+
+        self.assertEqual(bytes(g.data), data)
+        self.assertEqual(g.watchers, watchers)
+        self.assertEqual(g.journal, [])
+
+    def test_commit(self):
+        g = self.genome()
+        g.begin()
+        g.mutate(.1, 8)
+        edited = bytes(g.data)
+        g.commit()
+
+        self.assertEqual(bytes(g.data), edited)
+        self.assertEqual(g.journal, [])
+        self.assertEqual(g.savepoints, [])
+        self.assertNotIn(g.record, g.watchers)
+
+    def test_savepoints(self):
+        g = self.genome()
+        data = bytes(g.data)
+
+        g.begin()
+        g.mutate(.05, 8, ["A"])
+        first = bytes(g.data)
+        g.begin()
+        g.mutate(.05, 8, ["B"])
+        g.rollback() # only the inner edits
+        self.assertEqual(bytes(g.data), first)
+
+        g.begin()
+        g.mutate(.05, 8)
+        g.commit() # still undone by the outer rollback
+        g.rollback()
+        self.assertEqual(bytes(g.data), data)
+
+    def test_context(self):
+        g = self.genome()
+        data = bytes(g.data)
+
+        with self.assertRaises(KeyError):
+            with g.transaction():
+                g.mutate(.1, 8)
+                raise KeyError
+        self.assertEqual(bytes(g.data), data)
+
+        with g.transaction():
+            g.mutate(.1, 8)
+        self.assertNotEqual(bytes(g.data), data)
+        self.assertEqual(g.savepoints, [])
+
+    def test_watchers(self):
+        g = self.genome()
+        g.fingerprint()
+        g.addChecksum(grom.Checksum.gbGlobal())
+        before = (g.fingerprint(), g.checksums[0].value())
+
+        with g.transaction():
+            g.mutate(.1, 8)
+            g.rollback()
+            g.begin()
+        self.assertEqual((g.fingerprint(), g.checksums[0].value()), before)
+
+if __name__ == '__main__':
+    unittest.main()